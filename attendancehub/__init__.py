@@ -0,0 +1,19 @@
+"""
+AttendanceHub core: storage (Google Sheets) + analytics + messaging، بلا Streamlit.
+
+الـ submodules يتحمّلو وقت الاستعمال برك (pandas / gspread ثقال):
+    from attendancehub.messaging import wa_link      # Python صافي
+    from attendancehub import storage                # pandas + gspread
+"""
+import importlib
+
+__all__ = [
+    "schema", "runtime", "metrics", "gsheets", "frames",
+    "storage", "messaging", "analytics", "mirror", "importer", "reports", "cli",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,560 @@
+"""Analytics: رسائل الغيابات، views مدمجة، وaggregate الـ 10٪."""
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from .runtime import process_store
+from .schema import (
+    ABSENCES_COLS,
+    ABSENCES_SHEET,
+    NOTIF_LOG_COLS,
+    NOTIF_LOG_SHEET,
+    SUBJECTS_COLS,
+    SUBJECTS_SHEET,
+    TRAINEES_COLS,
+    TRAINEES_SHEET,
+)
+from .frames import as_bool, as_float
+from .storage import _frame_stamp, _load_sheet, _load_sheet_stamped
+from .messaging import _append_10pct_status, _compose_trainee_message
+
+
+# ================== WhatsApp: رسائل الغيابات ==================
+def _with_subject_cols(df_abs, df_sub_all):
+    # enriched_absences() فيها أعمدة المادة من قبل -> ما نعاودوش الـ merge
+    if {"nom_matiere", "heures_totales"}.issubset(df_abs.columns):
+        return df_abs
+    return df_abs.merge(
+        df_sub_all[["id", "nom_matiere", "heures_totales"]],
+        left_on="subject_id",
+        right_on="id",
+        how="left",
+        suffixes=("", "_sub"),
+    )
+
+
+def build_whatsapp_message_for_trainee(
+    tr_row,
+    df_abs_all,
+    df_sub_all,
+    branch_name,
+    d_from: date,
+    d_to: date,
+    period_label: str,
+) -> tuple[str, list[str]]:
+    """
+    ✅ Behavior:
+    - Show absences DETAILS only for the selected period.
+    - Compute 10% cumulatively (ALL TIME), but show status ONLY for subjects
+      that appear inside the selected period.
+    - For each such subject:
+        * if not exceeded -> show remaining hours before 10%
+        * if exceeded -> show elimination warning
+    """
+
+    trainee_id = tr_row["id"]
+    df_abs_t = df_abs_all[df_abs_all["trainee_id"] == trainee_id].copy()
+
+    if df_abs_t.empty:
+        return "", ["لا توجد غيابات لهذا المتكوّن في أي فترة."]
+
+    # attach subject info (مرة وحدة: للتفاصيل وللـ 10٪)
+    df_abs_t = _with_subject_cols(df_abs_t, df_sub_all)
+
+    # -----------------------------
+    # Period absences (details)
+    # -----------------------------
+    mask_period = (df_abs_t["date"].dt.date >= d_from) & (df_abs_t["date"].dt.date <= d_to)
+    df_abs_period = df_abs_t[mask_period].copy()
+
+    if df_abs_period.empty:
+        return "", ["لا توجد غيابات في هذه الفترة."]
+
+    detail_lines = []
+    for _, r in df_abs_period.iterrows():
+        dstr = r["date"].strftime("%Y-%m-%d")
+        subj = str(r.get("nom_matiere", "") or "").strip()
+        h = float(r["heures_absence"])
+        just = "مبرر" if r["justifie"] else "غير مبرر"
+        detail_lines.append(f"- {dstr} | {subj} | {h:.2f} ساعة ({just})")
+
+    # subjects present in selected period
+    period_subject_ids = set(
+        df_abs_period["subject_id"].dropna().astype(str).str.strip().tolist()
+    )
+
+    # -----------------------------
+    # Cumulative (ALL TIME) 10% status
+    # but we will only display for subjects in period
+    # -----------------------------
+    df_alltime = df_abs_t
+
+    df_eff_all = df_alltime[~df_alltime["justifie"]].copy()
+    df_eff_all["heures_absence_f"] = df_eff_all["heures_absence"].astype("float64")
+    df_eff_all["heures_totales_f"] = df_eff_all["heures_totales"].astype("float64")
+
+    status_lines = []
+    elim_lines = []
+
+    if not df_eff_all.empty and period_subject_ids:
+        grp = df_eff_all.groupby("subject_id", as_index=False, observed=True).agg(
+            total_abs=("heures_absence_f", "sum"),
+            heures_tot=("heures_totales_f", "first"),
+            matiere=("nom_matiere", "first"),
+        )
+        grp["limit_10"] = grp["heures_tot"] * 0.10
+        grp["remaining"] = grp["limit_10"] - grp["total_abs"]
+
+        grp["subject_id"] = grp["subject_id"].astype(str).str.strip()
+        grp = grp[grp["subject_id"].isin(period_subject_ids)].copy()
+
+        # ترتيب: الأقرب ل10% يظهر الأول
+        grp = grp.sort_values("remaining", ascending=True).reset_index(drop=True)
+
+        for _, g in grp.iterrows():
+            mat = str(g.get("matiere", "") or "").strip()
+            total_abs = float(g.get("total_abs", 0) or 0)
+            heures_tot = float(g.get("heures_tot", 0) or 0)
+            limit_10 = float(g.get("limit_10", 0) or 0)
+            remaining = float(g.get("remaining", 0) or 0)
+            _append_10pct_status(status_lines, elim_lines, mat, total_abs, heures_tot, limit_10, remaining)
+
+    return _compose_trainee_message(
+        tr_row, branch_name, period_label, detail_lines, status_lines, elim_lines,
+        n_period=len(df_abs_period), n_subjects=len(period_subject_ids),
+    )
+
+
+def _pandas_sort_order(values) -> list[int]:
+    # نفس ترتيب sort_values (quicksort، NaN في الآخر) باش النص يطلع نفسو بالضبط
+    arr = np.asarray(values, dtype=float)
+    nan = np.isnan(arr)
+    idx = np.arange(len(arr))
+    return idx[~nan][arr[~nan].argsort(kind="quicksort")].tolist() + idx[nan].tolist()
+
+
+def build_whatsapp_messages_for_trainees(
+    df_tr,
+    df_abs_all,
+    df_sub_all,
+    branch_name,
+    d_from: date,
+    d_to: date,
+    period_label: str,
+) -> dict:
+    """
+    نسخة batch من build_whatsapp_message_for_trainee لبرشا متكوّنين (نفس النص بالضبط):
+    merge المواد مرة وحدة للفرع، و groupby واحد على (trainee_id, subject_id)
+    بدل filter + merge مرتين لكل متكوّن.
+    يرجّع {trainee_id: (msg, info_debug)}.
+    """
+    tr_ids = df_tr["id"].tolist()
+    out = {tid: ("", ["لا توجد غيابات لهذا المتكوّن في أي فترة."]) for tid in tr_ids}
+
+    df_abs = df_abs_all[df_abs_all["trainee_id"].isin(set(tr_ids))]
+    if df_abs.empty:
+        return out
+
+    df_m = _with_subject_cols(df_abs, df_sub_all)
+    days = df_m["date"].dt.date
+    in_period = ((days >= d_from) & (days <= d_to)).fillna(False).astype(bool)
+
+    for tid in df_m["trainee_id"].unique():
+        out[tid] = ("", ["لا توجد غيابات في هذه الفترة."])
+
+    # ---- Period details (vectorized) ----
+    per = df_m[in_period]
+    if per.empty:
+        return out
+
+    dstr = per["date"].dt.strftime("%Y-%m-%d")
+    subj = per["nom_matiere"].map(lambda x: str(x or "").strip())
+    hours = per["heures_absence"].astype("float64").map("{:.2f}".format)
+    just = np.where(per["justifie"].to_numpy(dtype=bool), "مبرر", "غير مبرر")
+    per_lines = "- " + dstr + " | " + subj + " | " + hours + " ساعة (" + just + ")"
+
+    detail_by_tr = per_lines.groupby(per["trainee_id"], sort=False, observed=True).agg(list)
+    per_sub = per[["trainee_id", "subject_id"]].dropna(subset=["subject_id"])
+    period_pairs = set(zip(per_sub["trainee_id"], per_sub["subject_id"].astype(str).str.strip()))
+    n_subjects = pd.Series([t for t, _ in period_pairs]).value_counts() if period_pairs else pd.Series(dtype=int)
+
+    # ---- Cumulative (ALL TIME) 10% per (trainee_id, subject_id) ----
+    eff = df_m[~df_m["justifie"]].copy()
+    eff["heures_absence_f"] = eff["heures_absence"].astype("float64")
+    eff["heures_totales_f"] = eff["heures_totales"].astype("float64")
+    grp = eff.groupby(["trainee_id", "subject_id"], as_index=False, observed=True).agg(
+        total_abs=("heures_absence_f", "sum"),
+        heures_tot=("heures_totales_f", "first"),
+        matiere=("nom_matiere", "first"),
+    )
+    grp["limit_10"] = grp["heures_tot"] * 0.10
+    grp["remaining"] = grp["limit_10"] - grp["total_abs"]
+    grp["subject_id"] = grp["subject_id"].astype(str).str.strip()
+    keep = [(t, sid) in period_pairs for t, sid in zip(grp["trainee_id"], grp["subject_id"])]
+    grp = grp[keep]
+
+    status_by_tr = {}
+    for tid, g in zip(grp["trainee_id"], grp[["matiere", "total_abs", "heures_tot", "limit_10", "remaining"]].itertuples(index=False, name=None)):
+        status_by_tr.setdefault(tid, []).append(g)
+
+    tr_by_id = {tid: tr for tid, tr in zip(tr_ids, df_tr.to_dict("records"))}
+    for tid, detail_lines in detail_by_tr.items():
+        status_lines = []
+        elim_lines = []
+        rows = status_by_tr.get(tid, [])
+        for k in _pandas_sort_order([r[4] for r in rows]):
+            matiere, total_abs, heures_tot, limit_10, remaining = rows[k]
+            _append_10pct_status(
+                status_lines, elim_lines,
+                str(matiere or "").strip(),
+                float(total_abs or 0), float(heures_tot or 0), float(limit_10 or 0), float(remaining or 0),
+            )
+        out[tid] = _compose_trainee_message(
+            tr_by_id[tid], branch_name, period_label, detail_lines, status_lines, elim_lines,
+            n_period=len(detail_lines), n_subjects=int(n_subjects.get(tid, 0)),
+        )
+    return out
+
+
+# ================== Join views (memo على الـ snapshots) ==================
+# الـ merges اللي كانت تتعاود في كل tab (غيابات + متكوّن + مادة، سجل + متكوّن) تتحسب مرة
+# لكل combination متاع snapshots، ومقسومة بالفرع. أي كتابة في شيت من الشيتات تبدّل الـ stamp.
+ENRICH_TR_COLS = ["nom", "telephone", "tel_parent", "branche", "specialite"]
+ENRICH_SUB_COLS = ["nom_matiere", "heures_totales"]
+
+
+@process_store
+def _view_store() -> dict:
+    # views = {name: (key, value)}: key = tuple متاع _frame_stamp للشيتات اللي الـ view مبنية عليهم
+    return {"lock": threading.RLock(), "views": {}}
+
+
+def _memo_view(name: str, key: tuple, build):
+    if None in key:
+        return build()
+    store = _view_store()
+    with store["lock"]:
+        hit = store["views"].get(name)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    value = build()
+    with store["lock"]:
+        store["views"][name] = (key, value)
+    return value
+
+
+def _split_by_branch(df: pd.DataFrame) -> dict:
+    return {
+        str(b): g.reset_index(drop=True)
+        for b, g in df.groupby("branche", sort=False, observed=True)
+    }
+
+
+def _shared_frames(*sheets):
+    # [(df, stamp)] من الـ snapshots المشتركة؛ كان Google Sheets ما جاوبش -> load_* (mirror) بلا memo
+    try:
+        return [_load_sheet_stamped(s, c) for s, c in sheets]
+    except Exception:
+        return [(_load_sheet(s, c), None) for s, c in sheets]
+
+
+def _enriched_absences_view() -> dict:
+    (df_abs, k_abs), (df_tr, k_tr), (df_sub, k_sub) = _shared_frames(
+        (ABSENCES_SHEET, ABSENCES_COLS), (TRAINEES_SHEET, TRAINEES_COLS), (SUBJECTS_SHEET, SUBJECTS_COLS)
+    )
+
+    def build():
+        df = df_abs.merge(
+            df_tr[["id"] + ENRICH_TR_COLS].rename(columns={"id": "trainee_id"}),
+            on="trainee_id",
+            how="left",
+        ).merge(
+            df_sub[["id"] + ENRICH_SUB_COLS].rename(columns={"id": "subject_id"}),
+            on="subject_id",
+            how="left",
+        )
+        return {"all": df, "by_branch": _split_by_branch(df)}
+
+    return _memo_view("enriched_absences", (k_abs, k_tr, k_sub), build)
+
+
+def enriched_absences(branch: str | None = None) -> pd.DataFrame:
+    """
+    الغيابات + أعمدة المتكوّن (ENRICH_TR_COLS) + المادة (ENRICH_SUB_COLS)، left joins.
+    branch: الغيابات متاع متكوّني الفرع هذا برك.
+    """
+    view = _enriched_absences_view()
+    if branch is None:
+        return view["all"].copy()
+    df = view["by_branch"].get(branch)
+    return (view["all"].iloc[0:0] if df is None else df).copy()
+
+
+def notifications_with_trainees(branch: str) -> pd.DataFrame:
+    """سجل الإشعارات متاع الفرع + nom / specialite متاع المتكوّن."""
+    (df_notif, k_notif), (df_tr, k_tr) = _shared_frames(
+        (NOTIF_LOG_SHEET, NOTIF_LOG_COLS), (TRAINEES_SHEET, TRAINEES_COLS)
+    )
+
+    def build():
+        df = df_notif.merge(
+            df_tr[["id", "nom", "specialite"]].rename(columns={"id": "trainee_id"}),
+            on="trainee_id",
+            how="left",
+        )
+        return {"all": df, "by_branch": _split_by_branch(df)}
+
+    view = _memo_view("notifications_with_trainees", (k_notif, k_tr), build)
+    df = view["by_branch"].get(branch)
+    return (view["all"].iloc[0:0] if df is None else df).copy()
+
+
+
+# ================== سجل الإشعارات: index (de-dup) ==================
+# set process-wide متاع المفاتيح المسجّلة في Notifications_Log: قبل ما نولّدو رابط نشوفو
+# (O(1)) كان نفس الإشعار تبعث قبل. أي append من التطبيق يدخل للـ index طول (بلا rebuild).
+# إشعار 10٪ يتعرف بالـ label متاعو (ما فماش عمود kind في الشيت) ومفتاحو (متكوّن، target، فرع) برك:
+# تاريخ الإرسال ما يدخلش -> ما يتعاودش يتبعث كل نهار. إعلام المدة مفتاحو الفترة.
+NOTIF_KEY_COLS = ["trainee_id", "target", "branche", "period_from", "period_to", "period_label"]
+EXCEED_LABEL_PREFIX = "تجاوز 10٪"
+
+
+def notification_key(trainee_id, target: str, branche: str, period_from, period_to, period_label: str) -> tuple:
+    """مفتاح الإشعار كيف يتسجّل في الشيت (التواريخ YYYY-MM-DD)."""
+    def day(d):
+        return d.strftime("%Y-%m-%d") if hasattr(d, "strftime") else str(d)
+
+    label = str(period_label)
+    if label.startswith(EXCEED_LABEL_PREFIX):
+        return ("exceed_10pct", str(trainee_id), str(target), str(branche))
+    return ("period", str(trainee_id), str(target), day(period_from), day(period_to), label)
+
+
+@process_store
+def _notified_store() -> dict:
+    # keys = {notification_key}، stamp = _frame_stamp متاع الـ Notifications_Log اللي الـ index يطابقها
+    return {"lock": threading.RLock(), "keys": set(), "stamp": None}
+
+
+def _notified_keys(df: pd.DataFrame) -> set:
+    if df.empty:
+        return set()
+    return {notification_key(*k) for k in zip(*(df[c].astype(str) for c in NOTIF_KEY_COLS))}
+
+
+def notified_index() -> set:
+    """المفاتيح (notification_key) متاع الإشعارات المسجّلة — membership برك، ما تبدّلهاش."""
+    [(df, stamp)] = _shared_frames((NOTIF_LOG_SHEET, NOTIF_LOG_COLS))
+    idx = _notified_store()
+    with idx["lock"]:
+        if stamp is not None and idx["stamp"] == stamp:
+            return idx["keys"]
+        keys = _notified_keys(df)
+        if stamp is not None:
+            idx["keys"], idx["stamp"] = keys, stamp
+        return keys
+
+
+def _notified_written(before, after, appended_rows=None, cols=None):
+    # invalidate_sheet(Notifications_Log) -> الأسطر الجديدة تدخل للـ index والـ stamp يمشي مع الـ write-through
+    # (before / after = stamps الـ snapshot قبل وبعد الكتابة؛ غير هكّا الـ index يتعاود يتبنى)
+    idx = _notified_store()
+    with idx["lock"]:
+        if before is None or idx["stamp"] != before:
+            return
+        if after is None or appended_rows is None or cols is None:
+            idx["stamp"] = None
+            return
+        pos = [cols.index(c) for c in NOTIF_KEY_COLS]
+        idx["keys"].update(notification_key(*(str(r[p]) for p in pos)) for r in appended_rows)
+        idx["stamp"] = after
+
+# ================== 10٪: aggregate الساعات غير المبرّرة (trainee_id, subject_id) ==================
+# بدل ما نعاودو merge + groupby على الغيابات الكل في كل rerun: جدول process-wide يتحدّث
+# مع كل append / تعديل / حذف من التطبيق (delta)، ويتعاود يتبنى (vectorized) كان الـ snapshot
+# تبدّل من برّا. حد 10٪ يتحسب وقت القراءة من heures_totales -> تعديل مادة يبان طول.
+@process_store
+def _exceed_store() -> dict:
+    # by_abs = {absence_id: (trainee_id, subject_id, heures, justifie: bool)}
+    # hours / counts = {(trainee_id, subject_id): مجموع / عدد الغيابات غير المبرّرة}
+    # stamp = _frame_stamp متاع الـ Absences اللي الجدول يطابقها بالضبط (fetch ولا write-through)
+    # tables = memo لكل فرع: {branch: (key, exceeded, has_unjustified)}
+    return {"lock": threading.RLock(), "stamp": None, "gen": 0,
+            "by_abs": {}, "hours": {}, "counts": {}, "tables": {}}
+
+
+def _exceed_add(agg: dict, key, hours: float, sign: int):
+    h = round(agg["hours"].get(key, 0.0) + sign * hours, 9)
+    n = agg["counts"].get(key, 0) + sign
+    if n > 0:
+        agg["hours"][key], agg["counts"][key] = h, n
+    else:
+        agg["hours"].pop(key, None)
+        agg["counts"].pop(key, None)
+
+
+def _exceed_set(agg: dict, abs_id: str, rec):
+    # rec = (trainee_id, subject_id, heures, justifie) ولا None (حذف)
+    old = agg["by_abs"].pop(abs_id, None)
+    if old is not None and not old[3]:
+        _exceed_add(agg, (old[0], old[1]), old[2], -1)
+    if rec is not None:
+        agg["by_abs"][abs_id] = rec
+        if not rec[3]:
+            _exceed_add(agg, (rec[0], rec[1]), rec[2], +1)
+
+
+def _exceed_rebuild(agg: dict, df_abs: pd.DataFrame):
+    ids = df_abs["id"].astype(str)
+    tids = df_abs["trainee_id"].astype(str)
+    sids = df_abs["subject_id"].astype(str)
+    hrs = df_abs["heures_absence"].astype("float64")
+    just = df_abs["justifie"].astype(bool)
+    agg["by_abs"] = dict(zip(ids, zip(tids, sids, hrs, just)))
+
+    eff = pd.DataFrame({"t": tids, "s": sids, "h": hrs})[~just.to_numpy()]
+    g = eff.groupby(["t", "s"], sort=False)["h"].agg(["sum", "size"])
+    agg["hours"] = {k: round(float(h), 9) for k, h in g["sum"].items()}
+    agg["counts"] = {k: int(n) for k, n in g["size"].items()}
+
+
+def _typed_hours(x) -> float:
+    # نفس القيمة اللي typed_frame يعطيها (float64) باش الـ delta يطابق الـ rebuild
+    return as_float(x)
+
+
+def _exceed_absences_written(before, after, appended_rows=None, cols=None, deleted=None, updated=None):
+    """
+    يتنادى من invalidate_sheet(ABSENCES_SHEET) بعد الكتابة: كان الجدول يطابق الـ snapshot
+    اللي تكتب عليه (before) والـ write-through صار (after)، نطبّقو الـ delta وناخذو after.
+    وإلا يتعاود يتبنى في القراءة الجاية.
+    """
+    agg = _exceed_store()
+    with agg["lock"]:
+        if before is None or agg["stamp"] != before:
+            return
+        if after is None:
+            agg["stamp"] = None
+            return
+        if appended_rows is not None and cols is not None:
+            pos = {c: cols.index(c) for c in ("id", "trainee_id", "subject_id", "heures_absence", "justifie")}
+            for r in appended_rows:
+                _exceed_set(agg, str(r[pos["id"]]), (
+                    str(r[pos["trainee_id"]]), str(r[pos["subject_id"]]),
+                    _typed_hours(r[pos["heures_absence"]]), as_bool(r[pos["justifie"]]),
+                ))
+        elif deleted is not None and deleted[0] == "id":
+            for abs_id in deleted[1]:
+                _exceed_set(agg, str(abs_id), None)
+        elif updated is not None:
+            for abs_id, upd in updated:
+                old = agg["by_abs"].get(str(abs_id))
+                if old is None:
+                    agg["stamp"] = None
+                    return
+                _exceed_set(agg, str(abs_id), (
+                    str(upd.get("trainee_id", old[0])), str(upd.get("subject_id", old[1])),
+                    _typed_hours(upd["heures_absence"]) if "heures_absence" in upd else old[2],
+                    as_bool(upd["justifie"]) if "justifie" in upd else old[3],
+                ))
+        else:
+            agg["stamp"] = None
+            return
+        agg["stamp"] = after
+        agg["gen"] += 1
+
+
+def _exceed_absences_fetched(stale: dict, df: pd.DataFrame):
+    # incremental sync جاب أسطر جديدة (من برّا): نزيدوهم للجدول بلا rebuild
+    stamp = _frame_stamp(ABSENCES_SHEET)  # قبل الـ lock متاع الجدول (ما نركّبوش الـ locks)
+    if stamp is None or stamp[0] != stale["version"]:
+        return
+    agg = _exceed_store()
+    with agg["lock"]:
+        if agg["stamp"] != (stale["version"], stale["at"]):
+            return
+        new = df.iloc[len(stale["df"]):]
+        for r in zip(new["id"], new["trainee_id"], new["subject_id"], new["heures_absence"], new["justifie"]):
+            _exceed_set(agg, str(r[0]), (str(r[1]), str(r[2]), float(r[3]), bool(r[4])))
+        agg["stamp"] = stamp
+        agg["gen"] += 1
+
+
+def _exceed_sync():
+    # يرجّع الـ gen متاع الجدول (ولا None كان الشيت ما جاوبش -> الجدول ما يتعملش بيه)
+    try:
+        df_abs, stamp = _load_sheet_stamped(ABSENCES_SHEET, ABSENCES_COLS)
+    except Exception:
+        return None
+    agg = _exceed_store()
+    with agg["lock"]:
+        if stamp is not None and agg["stamp"] == stamp:
+            return agg["gen"]
+        # أي snapshot آخر (حتى نفس الـ version: full refetch فيه تعديلات يدوية) -> rebuild
+        _exceed_rebuild(agg, df_abs)
+        agg["stamp"] = stamp
+        agg["gen"] += 1
+        agg["tables"].clear()
+        return agg["gen"]
+
+
+def _exceed_pairs_frame(hours: dict, counts: dict) -> pd.DataFrame:
+    keys = list(hours)
+    return pd.DataFrame({
+        "trainee_id": [k[0] for k in keys],
+        "subject_id": [k[1] for k in keys],
+        "total_abs": [hours[k] for k in keys],
+    })
+
+
+def exceedance_table(branch: str, df_tr_b: pd.DataFrame, df_sub_b: pd.DataFrame, df_abs_all: pd.DataFrame):
+    """
+    (exceeded, has_unjustified) متاع الفرع: نفس جدول Tab4 (A).
+    الجدول يتحسب من الـ aggregate، ويتخزّن لين يتبدّل الـ aggregate ولا المتكوّنين / المواد.
+    """
+    gen = _exceed_sync()
+    agg = _exceed_store()
+    key = (gen, _frame_stamp(TRAINEES_SHEET), _frame_stamp(SUBJECTS_SHEET))
+    if gen is not None:
+        with agg["lock"]:
+            hit = agg["tables"].get(branch)
+            if hit is not None and hit[0] == key:
+                return hit[1].copy(), hit[2]
+            pairs = _exceed_pairs_frame(agg["hours"], agg["counts"])
+    else:
+        tmp = {"by_abs": {}, "hours": {}, "counts": {}}
+        _exceed_rebuild(tmp, df_abs_all)
+        pairs = _exceed_pairs_frame(tmp["hours"], tmp["counts"])
+
+    tr = df_tr_b[["id", "nom", "telephone", "tel_parent", "specialite"]].drop_duplicates("id").rename(columns={
+        "id": "trainee_id", "telephone": "tel", "specialite": "spec"})
+    sub = df_sub_b[["id", "nom_matiere", "heures_totales"]].drop_duplicates("id").rename(columns={
+        "id": "subject_id", "nom_matiere": "matiere"})
+    sub["heures_tot"] = sub.pop("heures_totales").astype("float64")
+
+    grp = pairs.merge(tr, on="trainee_id", how="inner").merge(sub, on="subject_id", how="inner")
+    grp = grp[grp["heures_tot"] > 0].sort_values(["trainee_id", "subject_id"], ignore_index=True)
+    has_unjustified = not grp.empty
+
+    grp["limit_10"] = grp["heures_tot"] * 0.10
+    grp["excess"] = grp["total_abs"] - grp["limit_10"]
+    exceeded = grp[grp["excess"] > 0].copy()
+    exceeded["total_abs"] = exceeded["total_abs"].round(2)
+    exceeded["excess"] = exceeded["excess"].round(2)
+    exceeded["limit_10"] = exceeded["limit_10"].round(2)
+    exceeded = exceeded.sort_values(["trainee_id", "excess"], ascending=[True, False]).reset_index(drop=True)
+
+    if gen is not None and None not in key:
+        with agg["lock"]:
+            agg["tables"][branch] = (key, exceeded, has_unjustified)
+    return exceeded.copy(), has_unjustified
+
+
+def remaining_before_10pct(trainee_id: str, subject_id: str, heures_totales) -> float:
+    """ساعات الغياب غير المبرّر اللي مازالو قبل 10٪ (سالب = فات). lookup برك بعد _exceed_sync."""
+    agg = _exceed_store()
+    with agg["lock"]:
+        used = agg["hours"].get((str(trainee_id), str(subject_id)), 0.0)
+    return float(heures_totales) * 0.10 - used
@@ -0,0 +1,122 @@
+"""
+CLI بلا Streamlit (batch / cron):
+
+    python -m attendancehub report --branch BZ --period month --target parent --out links.csv
+    python -m attendancehub report --branch all --kind exceed --out exceed.json --no-log
+
+الشيتات يتقراو مرة وحدة (values.batchGet)، الروابط تتكتب CSV / JSON،
+وأسطر Notifications_Log الكل تتزاد في append_rows واحد.
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import date
+
+from .gsheets import SheetsUnavailable, authorize_service_account, connect
+from .metrics import metrics_begin, metrics_end
+from .reports import TARGETS, branch_report, log_recs, period_range, report_frame
+from .schema import ALL_SHEETS, BRANCHES
+from .storage import append_notification_logs, prefetch_sheets
+
+BRANCH_ALIASES = {"MB": "Menzel Bourguiba", "BZ": "Bizerte"}
+KINDS = {"all": ("exceed_10pct", "period"), "exceed": ("exceed_10pct",), "period": ("period",)}
+
+
+def _branches(values: list[str] | None) -> list[str]:
+    out = []
+    for v in values or ["all"]:
+        if v == "all":
+            out += [b for b in BRANCHES if b not in out]
+            continue
+        b = BRANCH_ALIASES.get(v.upper(), v)
+        if b not in BRANCHES:
+            raise SystemExit(f"فرع غير معروف: {v} (الفروع: {', '.join(BRANCHES)}، MB، BZ، all)")
+        if b not in out:
+            out.append(b)
+    return out
+
+
+def write_report(df, out: str):
+    if out == "-":
+        df.to_csv(sys.stdout, index=False)
+    elif out.lower().endswith(".json"):
+        df.to_json(out, orient="records", force_ascii=False, indent=2)
+    else:
+        df.to_csv(out, index=False, encoding="utf-8-sig")  # utf-8-sig: Excel يقرا العربي
+
+
+def cmd_report(args) -> int:
+    if not args.sheet_id:
+        raise SystemExit("❌ SPREADSHEET_ID مفقود: --sheet-id ولا ATTENDANCEHUB_SHEET_ID")
+    if not os.path.exists(args.credentials):
+        raise SystemExit(f"❌ ملف الـ service account مش موجود: {args.credentials}")
+
+    branches = _branches(args.branch)
+    kinds = KINDS[args.kind]
+    target = TARGETS[args.target == "parent"]
+    period = None
+    if "period" in kinds:
+        period = period_range(args.period, args.date, args.date_from, args.date_to)
+
+    metrics_begin()
+    connect(authorize_service_account(path=args.credentials), args.sheet_id)
+    try:
+        prefetch_sheets(ALL_SHEETS)
+        rows = []
+        for branch in branches:
+            rows += branch_report(branch, target, kinds, period, args.remedial_month, args.spec, not args.resend)
+
+        write_report(report_frame(rows), args.out)
+        recs = [] if args.no_log else log_recs(rows)
+        logged = append_notification_logs(recs) if recs else 0
+    except SheetsUnavailable as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        summary = metrics_end(command="report", branches=branches, kind=args.kind)
+
+    print(
+        f"✅ {len(rows)} رابط -> {args.out} | سجل الإشعارات: {logged} سطر"
+        f" | {summary.get('wall_ms', 0):.0f} ms، {summary.get('api_calls', 0)} API calls",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _date(s: str) -> date:
+    try:
+        return date.fromisoformat(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"تاريخ غير صالح (YYYY-MM-DD): {s}") from None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="attendancehub", description="AttendanceHub بلا UI")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("report", help="روابط واتساب: تجاوز 10٪ + إعلام الغيابات حسب المدة")
+    r.add_argument("--branch", action="append", help="MB / BZ / اسم الفرع / all (يتعاود؛ default: all)")
+    r.add_argument("--kind", choices=list(KINDS), default="all", help="exceed = 10٪ برك، period = الفترة برك")
+    r.add_argument("--period", choices=["day", "week", "month", "custom"], default="month")
+    r.add_argument("--date", type=_date, default=None,
+                   help="day: اليوم، week: بداية الأسبوع، month: أي يوم من الشهر (default: اليوم)")
+    r.add_argument("--from", dest="date_from", type=_date, default=None, help="custom: من تاريخ")
+    r.add_argument("--to", dest="date_to", type=_date, default=None, help="custom: إلى تاريخ")
+    r.add_argument("--target", choices=["trainee", "parent"], default="parent")
+    r.add_argument("--spec", default=None, help="تخصّص واحد برك")
+    r.add_argument("--remedial-month", default="جويلية", help="شهر التدارك في رسالة 10٪")
+    r.add_argument("--out", default="links.csv", help="ملف .csv / .json ولا - (CSV على stdout)")
+    r.add_argument("--no-log", action="store_true", help="ما تكتبش في Notifications_Log")
+    r.add_argument("--resend", action="store_true",
+                   help="حتى الإشعارات المسجّلة قبل (already_sent=True في الملف، ما تتسجّلش مرة أخرى)")
+    r.add_argument("--credentials", default=os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", "service_account.json"))
+    r.add_argument("--sheet-id", default=os.environ.get("ATTENDANCEHUB_SHEET_ID", ""))
+    r.set_defaults(func=cmd_report)
+    return p
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")  # notify() -> stderr
+    args = build_parser().parse_args(argv)
+    return args.func(args)
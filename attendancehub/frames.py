@@ -0,0 +1,59 @@
+"""تحويلات الأنواع: قيم الشيت (نصوص) -> DataFrame typed."""
+import pandas as pd
+
+from .schema import BOOL_COLS, CATEGORY_COLS, DATE_COLS, FLOAT_COLS, JUSTIFIED
+
+
+# ================== Helpers: قيم الشيت -> أنواع ==================
+def as_float(x) -> float:
+    try:
+        return float(str(x).replace(",", ".").strip() or 0)
+    except Exception:
+        return 0.0
+
+
+def as_bool(x, true_value: str = JUSTIFIED) -> bool:
+    return str(x).strip() == true_value
+
+
+def parse_dates(s: pd.Series) -> pd.Series:
+    """
+    تواريخ الشيت -> datetime64 (NaT كان غالطة). صيغة ISO (اللي يكتبها التطبيق) تتقرا بسرعة
+    على العمود الكل، والباقي (CSV/Excel بصيغ أخرى) يتقرا واحد واحد بلا ما يطيّح الباقي.
+    """
+    dt = pd.to_datetime(s, errors="coerce", format="ISO8601")
+    rest = dt.isna() & (s.fillna("").astype(str).str.strip() != "")
+    if rest.any():
+        dt[rest] = pd.to_datetime(s[rest], errors="coerce", format="mixed")
+    return dt.astype("datetime64[us]")  # unit ثابت: عمود فارغ ولا كلو NaT يطلع [s] في pandas 3
+
+
+def typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    strings الشيت -> أنواع حسب FLOAT_COLS / DATE_COLS / BOOL_COLS / CATEGORY_COLS.
+    الأعمدة الأخرى (id, nom, ...) تقعد strings.
+    """
+    df = df.copy()
+    for c in df.columns:
+        if c in FLOAT_COLS:
+            raw = df[c].fillna("").astype(str).str.replace(",", ".", regex=False).str.strip()
+            df[c] = pd.to_numeric(raw, errors="coerce").fillna(0.0).astype("float64")
+        elif c in DATE_COLS:
+            df[c] = parse_dates(df[c])
+        elif c in BOOL_COLS:
+            df[c] = df[c].fillna("").astype(str).str.strip() == BOOL_COLS[c]
+        elif c in CATEGORY_COLS:
+            df[c] = df[c].fillna("").astype(str).astype("category")
+    return df
+
+
+def _concat_typed(df_old: pd.DataFrame, df_new: pd.DataFrame) -> pd.DataFrame:
+    # concat يخلّي الـ categoricals categoricals (كان الـ categories مختلفين pandas يرجّعهم object)
+    df_old, df_new = df_old.copy(deep=False), df_new.copy(deep=False)
+    for c in df_old.columns:
+        if isinstance(df_old[c].dtype, pd.CategoricalDtype) and isinstance(df_new[c].dtype, pd.CategoricalDtype):
+            old_cats = df_old[c].cat.categories
+            cats = old_cats.append(df_new[c].cat.categories.difference(old_cats))
+            df_old[c] = df_old[c].cat.set_categories(cats)
+            df_new[c] = df_new[c].cat.set_categories(cats)
+    return pd.concat([df_old, df_new], ignore_index=True)
@@ -0,0 +1,412 @@
+"""Google Sheets: retries + quota + circuit breaker، الـ client المشترك، وcache متاع الـ worksheets."""
+import json
+import random
+import time
+import threading
+from datetime import datetime
+
+import requests
+import gspread
+import gspread.exceptions as gse
+
+from .runtime import notify, process_store
+from .schema import SCOPE
+from .metrics import _count_response_bytes, metrics_count, timed_call
+
+
+# ================== Robust Google API helpers ==================
+def _apierr_details(e: Exception) -> str:
+    try:
+        if hasattr(e, "response") and e.response is not None:
+            try:
+                return json.dumps(e.response.json(), ensure_ascii=False)
+            except Exception:
+                return str(e.response.text)
+    except Exception:
+        pass
+    return str(e)
+
+
+def _status_code(e: Exception) -> int:
+    try:
+        if hasattr(e, "response") and e.response is not None:
+            return int(getattr(e.response, "status_code", 0) or 0)
+    except Exception:
+        pass
+    return 0
+
+
+def _should_retry_api_error(e: Exception) -> bool:
+    return _status_code(e) in (429, 500, 502, 503, 504)
+
+
+# ✅ core واحد للـ retries + rate limit، مشترك بين كل الـ sessions متاع الـ process
+SHEETS_QUOTA_PER_MIN = 60      # Sheets API: 60 read + 60 write / دقيقة / user
+RETRY_BASE_SEC = 0.35
+RETRY_MAX_SEC = 32.0
+BREAKER_FAIL_THRESHOLD = 6     # فشل متتالي (429/5xx/network) قبل ما نحلّو الـ breaker
+BREAKER_COOLDOWN_SEC = 30
+
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)
+
+
+class SheetsUnavailable(RuntimeError):
+    """الـ circuit breaker محلول: Google Sheets يرجّع أخطاء متتالية، ما نبعثوش طلبات لين يوفى الـ cooldown."""
+
+
+@process_store
+def _api_guard():
+    now = time.monotonic()
+    return {
+        "lock": threading.RLock(),
+        "buckets": {k: {"tokens": float(SHEETS_QUOTA_PER_MIN), "at": now} for k in ("read", "write")},
+        "fails": 0,          # فشل متتالي (يرجع 0 مع أول نجاح)
+        "open_until": 0.0,   # breaker محلول لين الوقت هذا؛ بعدو half-open: طلب فاشل واحد يحلّو من جديد
+        "stats": {},         # op -> counters
+    }
+
+
+def _is_transient(e: Exception) -> bool:
+    if isinstance(e, gse.APIError):
+        return _should_retry_api_error(e)
+    return isinstance(e, TRANSIENT_ERRORS + (SheetsUnavailable,))
+
+
+def _retry_after_sec(e: Exception) -> float:
+    try:
+        return max(0.0, float(e.response.headers.get("Retry-After")))
+    except Exception:
+        return 0.0
+
+
+def _retry_sleep(i: int, e: Exception = None) -> float:
+    # ✅ exponential + jitter (sessions ما يعاودوش في نفس اللحظة) و Retry-After كان الـ server بعثو
+    cap = min(RETRY_MAX_SEC, RETRY_BASE_SEC * (2 ** i))
+    delay = max(random.uniform(cap / 2, cap), _retry_after_sec(e) if e is not None else 0.0)
+    time.sleep(delay)
+    return delay
+
+
+def _op_stats(g: dict, op: str) -> dict:
+    s = g["stats"].get(op)
+    if s is None:
+        s = g["stats"][op] = {"calls": 0, "ok": 0, "retries": 0, "errors": 0, "throttled": 0, "sec": 0.0, "wait_sec": 0.0, "backoff_sec": 0.0}
+    return s
+
+
+def _take_token(g: dict, kind: str) -> float:
+    # token bucket: نحجزو token توّا (ولو بالسالب) ونستناو الفرق خارج الـ lock -> ترتيب عادل بين الـ threads
+    rate = SHEETS_QUOTA_PER_MIN / 60.0
+    with g["lock"]:
+        b = g["buckets"][kind]
+        now = time.monotonic()
+        b["tokens"] = min(float(SHEETS_QUOTA_PER_MIN), b["tokens"] + (now - b["at"]) * rate)
+        b["at"] = now
+        b["tokens"] -= 1.0
+        wait = -b["tokens"] / rate if b["tokens"] < 0 else 0.0
+    if wait > 0:
+        time.sleep(wait)
+    return wait
+
+
+def _api_call(op: str, call, tries: int = 4, write: bool = False):
+    """
+    كل طلب لـ Google Sheets يتعدّى من هنا: rate limit + retries + circuit breaker + counters.
+    يعاود كان على 429/5xx وأخطاء الشبكة برك؛ الباقي يطلع من أول مرة.
+    """
+    g = _api_guard()
+    last_err = None
+    for i in range(tries):
+        with g["lock"]:
+            s = _op_stats(g, op)
+            s["calls"] += 1
+            blocked = g["open_until"] - time.monotonic()
+        if blocked > 0:
+            with g["lock"]:
+                s["errors"] += 1
+            raise SheetsUnavailable(f"Google Sheets ما يجاوبش، نعاودو بعد {blocked:.0f}s ({op})") from last_err
+
+        waited = _take_token(g, "write" if write else "read")
+        keep_token_fresh()
+        t0 = time.perf_counter()
+        try:
+            out = call()
+        except Exception as e:
+            metrics_count(f"api:{op}", time.perf_counter() - t0)
+            last_err = e
+            transient = _is_transient(e)
+            with g["lock"]:
+                s["wait_sec"] += waited
+                if _status_code(e) == 429:
+                    s["throttled"] += 1
+                if transient:
+                    g["fails"] += 1
+                    if g["fails"] >= BREAKER_FAIL_THRESHOLD:
+                        g["open_until"] = time.monotonic() + BREAKER_COOLDOWN_SEC
+                if not transient or i == tries - 1:
+                    s["errors"] += 1
+                    raise
+                s["retries"] += 1
+            slept = _retry_sleep(i, e)
+            with g["lock"]:
+                s["backoff_sec"] += slept
+            continue
+
+        sec = time.perf_counter() - t0
+        metrics_count(f"api:{op}", sec)
+        with g["lock"]:
+            s["ok"] += 1
+            s["sec"] += sec
+            s["wait_sec"] += waited
+            g["fails"] = 0
+            g["open_until"] = 0.0
+        return out
+    raise last_err
+
+
+def api_stats() -> dict:
+    g = _api_guard()
+    with g["lock"]:
+        return {op: dict(s) for op, s in g["stats"].items()}
+
+
+def safe_row_values(ws, row: int, tries: int = 4):
+    return _api_call("row_values", lambda: ws.row_values(row), tries)
+
+
+def safe_get_all_values(ws, tries: int = 4):
+    return _api_call("get_all_values", ws.get_all_values, tries)
+
+
+def safe_batch_get(ws, ranges: list[str], tries: int = 4):
+    return _api_call("batch_get", lambda: ws.batch_get(ranges), tries)
+
+
+def safe_update(ws, rng: str, values, tries: int = 4):
+    return _api_call("update", lambda: ws.update(rng, values), tries, write=True)
+
+
+def safe_update_cell(ws, row: int, col: int, value, tries: int = 4):
+    return _api_call("update_cell", lambda: ws.update_cell(row, col, value), tries, write=True)
+
+
+def safe_batch_update_values(ws, data: list[dict], tries: int = 4):
+    # USER_ENTERED كيف update_cell (التواريخ/الأرقام تتفهم كيف قبل)
+    return _api_call("batch_update_values", lambda: ws.batch_update(data, raw=False), tries, write=True)
+
+
+def safe_append_row(ws, row_values, tries: int = 4):
+    return _api_call("append_row", lambda: ws.append_row(row_values), tries, write=True)
+
+
+def safe_append_rows(ws, rows, tries: int = 4):
+    return _api_call("append_rows", lambda: ws.append_rows(rows), tries, write=True)
+
+
+def safe_delete_rows(ws, row_index: int, tries: int = 4):
+    return _api_call("delete_rows", lambda: ws.delete_rows(row_index), tries, write=True)
+
+
+def safe_batch_update(sh, body: dict, tries: int = 4):
+    return _api_call("batch_update", lambda: sh.batch_update(body), tries, write=True)
+
+
+def safe_values_batch_get(sh, ranges: list[str], tries: int = 4):
+    return _api_call("values_batch_get", lambda: sh.values_batch_get(ranges), tries)
+
+
+# ================== Auth ==================
+HTTP_POOL_SIZE = 16              # connections keep-alive مفتوحين، مشتركين بين كل الـ sessions
+HTTP_TIMEOUT_SEC = (5, 60)       # (connect, read): connection واقفة تولّي Timeout وتتعاود في _api_call
+TOKEN_REFRESH_MARGIN_SEC = 600   # نجدّدو الـ token 10 دقايق قبل ما يوفى، مش وسط طلب
+
+
+def authorize(creds):
+    from google.auth.transport.requests import AuthorizedSession  # lazy: google.auth.transport ثقيل
+
+    # ✅ AuthorizedSession وحدة لكل process: TLS handshake + connections keep-alive يتعاودو
+    session = AuthorizedSession(creds)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(_count_response_bytes)
+    client_ = gspread.authorize(None, session=session)  # gspread: مع session متاعنا credentials = None
+    client_.http_client.timeout = HTTP_TIMEOUT_SEC
+    return client_
+
+
+def authorize_service_account(info: dict | None = None, path: str | None = None):
+    """client من service account: info (dict متاع st.secrets) ولا path (ملف JSON)."""
+    from google.oauth2.service_account import Credentials
+
+    if info is not None:
+        creds = Credentials.from_service_account_info(info, scopes=SCOPE)
+    else:
+        creds = Credentials.from_service_account_file(path, scopes=SCOPE)
+    return authorize(creds)
+
+
+@process_store
+def _token_guard():
+    from google.auth.transport.requests import Request as AuthRequest
+
+    return {"lock": threading.Lock(), "request": AuthRequest()}
+
+
+def keep_token_fresh():
+    """يجدّد الـ access token قبل ما يوفى؛ thread واحد يجدّد والباقي يكمّلو بالـ token القديم (مازال صالح)."""
+    creds = getattr(getattr(getattr(client, "http_client", None), "session", None), "credentials", None)
+    if creds is None:
+        return
+    expiry = getattr(creds, "expiry", None)
+    if creds.token and expiry is not None and (expiry - datetime.utcnow()).total_seconds() > TOKEN_REFRESH_MARGIN_SEC:
+        return
+
+    g = _token_guard()
+    if not g["lock"].acquire(blocking=False):
+        return
+    try:
+        creds.refresh(g["request"])
+    except Exception:
+        pass  # AuthorizedSession يعاود يجرّب وحدو مع الطلب، والغلطة تطلع من غادي
+    finally:
+        g["lock"].release()
+
+
+# الـ client يتحلّ في main() متاع الـ app / الـ CLI (ولا connect(fake) في benchmarks) مش وقت الـ import
+client, SPREADSHEET_ID = None, None
+
+
+def connect(client_, sheet_id):
+    global client, SPREADSHEET_ID
+    client, SPREADSHEET_ID = client_, sheet_id
+
+
+# ================== FAST worksheet cache (Fix الدوّارة + fetch_sheet_metadata) ==================
+# ✅ process-wide (process_store): كل الـ sessions يتقاسمو نفس الـ spreadsheet + ws_map
+WSMAP_TTL_SEC = 120
+
+def _now_ts() -> float:
+    return time.time()
+
+@process_store
+def _shared_sheet_handles() -> dict:
+    # lock = single-flight: session وحدة تعمل open/worksheets() والباقي يستناو النتيجة
+    # headers_ok = {ws.id: وقت آخر تحقّق من الـ header}
+    return {"lock": threading.RLock(), "sh_obj": None, "sh_id": None, "ws_map": None, "ws_map_at": 0, "headers_ok": {}}
+
+def _invalidate_sheet_cache():
+    h = _shared_sheet_handles()
+    with h["lock"]:
+        h["sh_obj"] = None
+        h["sh_id"] = None
+        h["ws_map"] = None
+        h["ws_map_at"] = 0
+        h["headers_ok"] = {}
+
+def _header_verified(ws) -> bool:
+    ts = _shared_sheet_handles()["headers_ok"].get(ws.id, 0)
+    return (_now_ts() - ts) < WSMAP_TTL_SEC
+
+def _mark_header_verified(ws):
+    _shared_sheet_handles()["headers_ok"][ws.id] = _now_ts()
+
+def check_header_from_values(ws, columns: list[str], vals: list[list[str]]) -> list[list[str]]:
+    """
+    نفس تحقّق ensure_ws أما من السطر 1 متاع snapshot get_all_values (بلا row_values زايدة).
+    يرجّع vals بالـ header المصلّح كان لزم.
+    """
+    header = vals[0] if vals else []
+    if (not header) or (header[: len(columns)] != columns):
+        safe_update(ws, "1:1", [columns])
+        vals = [list(columns) + list(header[len(columns):])] + list(vals[1:])
+    _mark_header_verified(ws)
+    return vals
+
+@timed_call
+def get_spreadsheet():
+    h = _shared_sheet_handles()
+    if h["sh_id"] == SPREADSHEET_ID and h["sh_obj"] is not None:
+        return h["sh_obj"]
+
+    with h["lock"]:
+        if h["sh_id"] == SPREADSHEET_ID and h["sh_obj"] is not None:
+            return h["sh_obj"]  # session أخرى حلّتو وقت اللي كنا نستناو
+
+        try:
+            sh = _api_call("open_by_key", lambda: client.open_by_key(SPREADSHEET_ID))
+        except gse.APIError as e:
+            if _should_retry_api_error(e):
+                notify("error", "❌ فشل فتح Google Sheet بعد retries:\n" + _apierr_details(e))
+            else:
+                notify("error", "❌ Google Sheets APIError (open_by_key):\n" + _apierr_details(e))
+            raise
+        except Exception as e:
+            notify("error", "❌ فشل فتح Google Sheet بعد retries:\n" + _apierr_details(e))
+            raise
+        h["sh_obj"] = sh
+        h["sh_id"] = SPREADSHEET_ID
+        return sh
+
+@timed_call
+def get_ws_map(sh, force_refresh: bool = False):
+    h = _shared_sheet_handles()
+
+    def fresh():
+        return h["ws_map"] and (_now_ts() - h["ws_map_at"]) < WSMAP_TTL_SEC
+
+    if (not force_refresh) and fresh():
+        return h["ws_map"]
+
+    with h["lock"]:
+        if (not force_refresh) and fresh():
+            return h["ws_map"]
+
+        wss = _api_call("worksheets", sh.worksheets)  # ✅ metadata مرة وحدة بدل worksheet() كل مرة
+        ws_map = {w.title.strip(): w for w in wss}
+        h["ws_map"] = ws_map
+        h["ws_map_at"] = _now_ts()
+        return ws_map
+
+@timed_call
+def ensure_ws(title: str, columns: list[str], verify_header: bool = True):
+    """
+    verify_header=False: الـ caller باش يتحقّق بنفسو من snapshot (check_header_from_values).
+    التحقّق بـ row_values يصير مرة برك في كل WSMAP_TTL_SEC لكل worksheet.
+    """
+    title = title.strip()
+    last_err = None
+
+    # الـ retries على 429/5xx/network صارو في _api_call؛ هنا نعاودو مرة برك بعد ما نفرّغو الـ cache (ws handle قديم)
+    for _ in range(2):
+        try:
+            sh = get_spreadsheet()
+            ws_map = get_ws_map(sh, force_refresh=False)
+
+            ws = ws_map.get(title)
+            if ws is None:
+                ws = _api_call("add_worksheet", lambda: sh.add_worksheet(title=title, rows="2000", cols=str(max(len(columns), 8))), write=True)
+                safe_update(ws, "1:1", [columns])
+                _mark_header_verified(ws)
+                get_ws_map(sh, force_refresh=True)  # refresh بعد الإنشاء
+                return ws
+
+            if verify_header and not _header_verified(ws):
+                header = safe_row_values(ws, 1)
+                if (not header) or (header[: len(columns)] != columns):
+                    safe_update(ws, "1:1", [columns])
+                _mark_header_verified(ws)
+
+            return ws
+
+        except (gse.APIError, SheetsUnavailable) as e:
+            _invalidate_sheet_cache()
+            notify("error", f"❌ APIError في ensure_ws('{title}'):\n" + _apierr_details(e))
+            raise
+        except Exception as e:
+            last_err = e
+            _invalidate_sheet_cache()
+            if _is_transient(e):
+                break
+
+    notify("error", f"❌ فشل ensure_ws('{title}') بعد retries:\n" + _apierr_details(last_err))
+    raise last_err
@@ -0,0 +1,194 @@
+"""Import engine: ملف CSV/Excel كبير بالـ chunks، تحقّق vectorized، append batched."""
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from .schema import ABSENCES_COLS, ABSENCES_SHEET, JUSTIFIED
+from .frames import parse_dates
+from .storage import append_records, load_absences, load_subjects, load_trainees
+
+
+# ================== Import engine (chunks + تحقّق vectorized) ==================
+IMPORT_REQUIRED_COLS = ["trainee_id", "subject_id", "date", "heures_absence"]
+IMPORT_CHUNK_ROWS = 5000     # أسطر تتقرا من الملف في المرة
+IMPORT_APPEND_BATCH = 2000   # أسطر في كل append_rows
+
+
+def _excel_chunk(buf: list, header: list, first_line: int) -> pd.DataFrame:
+    df = pd.DataFrame(buf, columns=header).astype(str)
+    df.index = pd.RangeIndex(first_line - 2, first_line - 2 + len(df))
+    return df
+
+
+def read_import_chunks(uploaded, chunk_rows: int = IMPORT_CHUNK_ROWS):
+    """
+    يقرا CSV/Excel chunk بـ chunk (strings برك) بلا ما يحمّل الملف الكل.
+    الـ index يتبّع ترتيب الأسطر في الملف: السطر = index + 2 (سطر 1 هو الـ header).
+    """
+    if not str(getattr(uploaded, "name", "")).lower().endswith(".xlsx"):
+        yield from pd.read_csv(uploaded, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+        return
+
+    import openpyxl  # نفس الـ engine متاع pd.read_excel؛ read_only يقرا الأسطر بالتوالي
+
+    wb = openpyxl.load_workbook(uploaded, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = ["" if h is None else str(h) for h in next(rows, ())]
+        buf, line = [], 2
+        for row in rows:
+            row = ["" if v is None else v for v in row[: len(header)]]
+            buf.append(row + [""] * (len(header) - len(row)))
+            if len(buf) >= chunk_rows:
+                yield _excel_chunk(buf, header, line)
+                line += len(buf)
+                buf = []
+        if buf:
+            yield _excel_chunk(buf, header, line)
+    finally:
+        wb.close()
+
+
+def count_import_rows(uploaded):
+    """عدد أسطر البيانات (بلا header) للـ progress/ETA؛ None كان ما نجموش نعرفوه بلا ما نقراو الملف."""
+    try:
+        if str(getattr(uploaded, "name", "")).lower().endswith(".xlsx"):
+            import openpyxl
+
+            wb = openpyxl.load_workbook(uploaded, read_only=True)
+            try:
+                n = wb.worksheets[0].max_row
+            finally:
+                wb.close()
+                uploaded.seek(0)
+            return max(0, n - 1) if n else None
+
+        data = uploaded.getvalue()
+        nl = b"\n" if isinstance(data, bytes) else "\n"
+        return max(0, data.count(nl) + (0 if data.endswith(nl) else 1) - 1)
+    except Exception:
+        return None
+
+
+def eta_sec(done: int, total, elapsed: float):
+    if not total or done <= 0:
+        return None
+    return elapsed * max(0, total - done) / done
+
+
+def _absence_keys(tids: pd.Series, sids: pd.Series, dates: pd.Series) -> pd.Series:
+    return tids.astype(str) + "|" + sids.astype(str) + "|" + dates.dt.strftime("%Y-%m-%d").fillna("")
+
+
+def _import_context() -> dict:
+    df_tr, df_sub, df_abs = load_trainees(), load_subjects(), load_absences()
+    seen = set()
+    if not df_abs.empty:
+        seen = set(_absence_keys(df_abs["trainee_id"], df_abs["subject_id"], df_abs["date"]))
+    return {
+        "tr_branch": dict(zip(df_tr["id"].astype(str), df_tr["branche"].astype(str))) if not df_tr.empty else {},
+        "sub_branch": dict(zip(df_sub["id"].astype(str), df_sub["branche"].astype(str))) if not df_sub.empty else {},
+        "seen": seen,  # (trainee_id|subject_id|date) الموجودين في الشيت + اللي تقبلو من الملف
+    }
+
+
+def validate_import_chunk(chunk: pd.DataFrame, branch: str, ctx: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    -> (الأسطر المقبولة بأعمدة ABSENCES_COLS (strings)، الأسطر المرفوضة + ligne + raison).
+    ctx["seen"] يتحدّث بالأسطر المقبولة باش المكرّر في chunk جاية يترفض زادة.
+    """
+    df = chunk.rename(columns=lambda c: str(c).strip()).fillna("")
+    tids = df["trainee_id"].astype(str).str.strip()
+    sids = df["subject_id"].astype(str).str.strip()
+    dates = parse_dates(df["date"].astype(str).str.strip())
+    hours = pd.to_numeric(df["heures_absence"].astype(str).str.replace(",", ".", regex=False).str.strip(), errors="coerce")
+    tr_branch = tids.map(ctx["tr_branch"])
+    sub_branch = sids.map(ctx["sub_branch"])
+
+    checks = [
+        (tr_branch.isna(), "trainee_id غير موجود"),
+        (tr_branch.notna() & (tr_branch != branch), "المتكوّن من فرع آخر"),
+        (sub_branch.isna(), "subject_id غير موجود"),
+        (sub_branch.notna() & (sub_branch != branch), "المادة من فرع آخر"),
+        (dates.isna(), "تاريخ غير صالح"),
+        (~(hours > 0), "الساعات لازم رقم أكبر من 0"),
+    ]
+    reason = pd.Series("", index=df.index, dtype=object)
+    for mask, msg in checks:
+        reason = reason + np.where(mask, msg + "؛ ", "")
+
+    keys = _absence_keys(tids, sids, dates)
+    valid = reason == ""
+    # membership في الـ set نفسو (Series.isin(set) يحوّل الـ set الكل لكل chunk)
+    reason[valid & keys.map(ctx["seen"].__contains__).astype(bool)] = "موجود من قبل"
+    valid = reason == ""
+    reason[valid & keys.duplicated()] = "مكرّر في الملف"
+    ok = reason == ""
+    ctx["seen"].update(keys[ok])
+
+    justifie = df["justifie"] if "justifie" in df.columns else pd.Series("", index=df.index)
+    comment = df["commentaire"] if "commentaire" in df.columns else pd.Series("", index=df.index)
+    accepted = pd.DataFrame({
+        "id": [uuid.uuid4().hex[:10] for _ in range(int(ok.sum()))],
+        "trainee_id": tids[ok].to_numpy(),
+        "subject_id": sids[ok].to_numpy(),
+        "date": dates[ok].dt.strftime("%Y-%m-%d").to_numpy(),
+        "heures_absence": hours[ok].map(repr).to_numpy(),  # كيف str(float) متاع الفورم، بلا تدوير
+        "justifie": np.where(justifie[ok].astype(str).str.strip() == JUSTIFIED, "Oui", "Non"),
+        "commentaire": comment[ok].astype(str).str.strip().to_numpy(),
+    }, columns=ABSENCES_COLS)
+
+    rejected = df[~ok].copy()
+    rejected.insert(0, "ligne", rejected.index + 2)
+    rejected["raison"] = reason[~ok].str.rstrip("؛ ")
+    return accepted, rejected
+
+
+def import_absences(chunks, branch: str, progress=None) -> dict:
+    """
+    chunks (read_import_chunks) -> تحقّق + append_rows بـ IMPORT_APPEND_BATCH سطر.
+    progress(done, imported): done = أسطر تقراو وتكتبو (ولا ترفضو)، بعد كل chunk وكل append_rows.
+    يرجّع {"read", "imported", "rejected": DataFrame, "error", "not_written"}:
+    كان صار خطأ في الوسط (قراءة ولا append_rows) الاستيراد يوقف، الأسطر اللي تكتبت تقعد في الشيت
+    (imported)، وerror / not_written يقولو شنوّة ما تكتبش — والتقرير يرجع ديما.
+    """
+    n_read = n_ok = 0
+    batch, rejected = [], []
+    error = None
+
+    try:
+        ctx = _import_context()
+        for chunk in chunks:
+            missing = [c for c in IMPORT_REQUIRED_COLS if c not in {str(x).strip() for x in chunk.columns}]
+            if missing:
+                raise ValueError(f"الملف لازم يحتوي الأعمدة: {', '.join(missing)}")
+
+            accepted, rej = validate_import_chunk(chunk, branch, ctx)
+            n_read += len(chunk)
+            if not rej.empty:
+                rejected.append(rej)
+            batch.extend(accepted.to_dict("records"))
+            while len(batch) >= IMPORT_APPEND_BATCH:
+                n_ok += append_records(ABSENCES_SHEET, ABSENCES_COLS, batch[:IMPORT_APPEND_BATCH])
+                batch = batch[IMPORT_APPEND_BATCH:]
+                if progress:
+                    progress(n_read - len(batch), n_ok)
+            if progress:
+                progress(n_read - len(batch), n_ok)
+
+        if batch:
+            n_ok += append_records(ABSENCES_SHEET, ABSENCES_COLS, batch)
+            batch = []
+            if progress:
+                progress(n_read, n_ok)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+
+    return {
+        "read": n_read,
+        "imported": n_ok,
+        "rejected": pd.concat(rejected) if rejected else pd.DataFrame(columns=["ligne", "raison"]),
+        "error": error,
+        "not_written": len(batch),  # أسطر مقبولة ما وصلتش للشيت (الـ chunks اللي ما تقراوش موش محسوبين)
+    }
@@ -0,0 +1,101 @@
+"""رسائل واتساب (نص + رابط wa.me) — Python صافي، بلا pandas."""
+import urllib.parse
+
+
+# ================== Helpers ==================
+def normalize_phone(s: str) -> str:
+    digits = "".join(c for c in str(s) if c.isdigit())
+    if len(digits) == 8:
+        return "216" + digits
+    return digits
+
+
+def wa_link(number: str, message: str) -> str:
+    num = normalize_phone(number)
+    if not num:
+        return ""
+    return f"https://wa.me/{num}?text={urllib.parse.quote(message)}"
+
+
+def _append_10pct_status(status_lines, elim_lines, mat, total_abs, heures_tot, limit_10, remaining):
+    if remaining <= 0:
+        excess = total_abs - limit_10
+        elim_lines.append(f"- {mat} (تجاوز بـ {excess:.2f} ساعة)")
+    else:
+        status_lines.append(
+            f"- {mat}: مزال {remaining:.2f} ساعة قبل ما تفوت 10٪ "
+            f"(حد 10٪ = {limit_10:.2f} ساعة من {heures_tot:.2f} ساعة)"
+        )
+
+
+def _compose_trainee_message(
+    tr_row, branch_name, period_label, detail_lines, status_lines, elim_lines, n_period, n_subjects
+) -> tuple[str, list[str]]:
+    msg_lines = []
+    msg_lines.append("السلام عليكم،")
+    msg_lines.append("إدارة هيكل التكوين تحب تعلمك بتفاصيل الغيابات اللي تمّ تسجيلها في الفترة المحدّدة:")
+    msg_lines.append("")
+    msg_lines.append(f"👤 المتكوّن: {tr_row.get('nom', '')}")
+    msg_lines.append(f"🏫 الفرع: {branch_name}")
+    msg_lines.append(f"🔧 التخصّص: {tr_row.get('specialite', '')}")
+    msg_lines.append(f"🕒 الفترة: {period_label}")
+    msg_lines.append("")
+    msg_lines.append("📋 تفاصيل الغيابات في هذه الفترة:")
+    msg_lines.extend(detail_lines)
+
+    if status_lines:
+        msg_lines.append("")
+        msg_lines.append("📌 وضعية 10٪ للمواد اللي صار فيهم غياب في هالفترة:")
+        msg_lines.extend(status_lines)
+
+    if elim_lines:
+        msg_lines.append("")
+        msg_lines.append("⚠️ يؤسفني إعلامكم أنّ هذه المادة/المواد سيتم إجراء الإمتحان بشهر أوت وذلك لتجاوزكم الحد الأقصى المسموح به من الغيابات (10٪):")
+        msg_lines.extend(elim_lines)
+
+    msg_lines.append("")
+    msg_lines.append("🙏 نشكروك على تفهّمك، ومرحبا بيك في الإدارة لأي استفسار.")
+
+    msg = "\n".join(msg_lines)
+    info_debug = [
+        f"غيابات في الفترة: {n_period}",
+        f"مواد في الفترة: {n_subjects}",
+        f"مواد مريقلة (remaining>0): {len(status_lines)}",
+        f"مواد فاتو 10٪: {len(elim_lines)}",
+    ]
+    return msg, info_debug
+
+
+# ================== exceed 10% (رسالة واحدة لكل متكوّن) ==================
+def build_exceed_10pct_message_one(
+    trainee_name: str,
+    branch_name: str,
+    spec: str,
+    items: list,
+    remedial_month: str
+) -> str:
+    """
+    items: list of dicts: {matiere, total_abs, limit_10, excess, heures_tot}
+    """
+    lines = []
+    lines.append("السلام عليكم،")
+    lines.append("إدارة هيكل التكوين تحب تعلمك أنّه تمّ تجاوز 10٪ من الغيابات غير المبرّرة في المواد التالية:")
+    lines.append("")
+    lines.append(f"👤 المتكوّن: {trainee_name}")
+    lines.append(f"🏫 الفرع: {branch_name}")
+    if spec:
+        lines.append(f"🔧 التخصّص: {spec}")
+    lines.append("")
+    lines.append("📌 المواد اللي تمّ تجاوز 10٪ فيها:")
+    for it in items:
+        lines.append(
+            f"- {it['matiere']}:\n"
+            f"   • مجموع الغياب غير المبرر: {it['total_abs']:.2f} ساعة\n"
+            f"   • حدّ 10٪: {it['limit_10']:.2f} ساعة (من {it['heures_tot']:.2f} ساعة)\n"
+            f"   • تجاوز بـ: {it['excess']:.2f} ساعة"
+        )
+    lines.append("")
+    lines.append(f"📌 دورة التدارك: {remedial_month}")
+    lines.append("")
+    lines.append("🙏 شكراً على التفهّم. لأي استفسار مرحبا بكم في الإدارة.")
+    return "\n".join(lines)
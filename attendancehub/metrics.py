@@ -0,0 +1,110 @@
+"""Instrumentation: وقت + API calls لكل rerun (ولا لكل أمر CLI)."""
+import json
+import functools
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from .runtime import setting
+
+
+# ================== Instrumentation (وقت + API calls لكل rerun) ==================
+# كل session تخدم الـ script في thread متاعها -> الـ counters متاع الـ rerun في threading.local.
+# الـ threads الأخرى (mirror sync...) ما عندهمش metrics_begin وما يتحسبوش.
+_rerun_metrics = threading.local()
+
+
+def metrics_begin():
+    _rerun_metrics.cur = {
+        "t0": time.perf_counter(),
+        "lap": None,       # (section, t) الـ section اللي خدّامة توّا
+        "sections": {},    # section -> sec
+        "calls": {},       # api:<op> / get_spreadsheet / load_* ... -> [n, sec]
+        "bytes": 0,        # body متاع الـ responses (بعد gzip)
+        "cache": {},       # sheet -> [hits, misses]
+    }
+
+
+def _metrics():
+    return getattr(_rerun_metrics, "cur", None)
+
+
+def metrics_count(name: str, sec: float):
+    m = _metrics()
+    if m is not None:
+        c = m["calls"].setdefault(name, [0, 0.0])
+        c[0] += 1
+        c[1] += sec
+
+
+def metrics_cache(sheet_name: str, hit: bool):
+    m = _metrics()
+    if m is not None:
+        m["cache"].setdefault(sheet_name, [0, 0])[0 if hit else 1] += 1
+
+
+def _count_response_bytes(resp, *args, **kwargs):
+    m = _metrics()
+    if m is not None:
+        m["bytes"] += len(resp.content or b"")
+
+
+@contextmanager
+def timed(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics_count(name, time.perf_counter() - t0)
+
+
+def timed_call(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with timed(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def lap(section):
+    """يسكّر الـ section اللي قبلها ويبدا section جديدة (None = يسكّر برك)؛ بلا ما نزيدو indentation للصفحات."""
+    m = _metrics()
+    if m is None:
+        return
+    now = time.perf_counter()
+    if m["lap"] is not None:
+        prev, t = m["lap"]
+        m["sections"][prev] = m["sections"].get(prev, 0.0) + (now - t)
+    m["lap"] = (section, now) if section else None
+
+
+def _metrics_log_path() -> str:
+    return setting("METRICS_LOG_PATH", "ATTENDANCEHUB_METRICS_LOG")
+
+
+def metrics_end(**context) -> dict:
+    """يسكّر الـ rerun: summary (ms) + سطر JSON في METRICS_LOG_PATH كان مضبوط."""
+    m = _metrics()
+    if m is None:
+        return {}
+    lap(None)
+    _rerun_metrics.cur = None
+    summary = {
+        **context,
+        "at": datetime.utcnow().isoformat(),
+        "wall_ms": round((time.perf_counter() - m["t0"]) * 1000, 1),
+        "api_calls": sum(n for name, (n, _) in m["calls"].items() if name.startswith("api:")),
+        "bytes": m["bytes"],
+        "cache": {k: {"hit": h, "miss": ms} for k, (h, ms) in m["cache"].items()},
+        "sections_ms": {k: round(v * 1000, 1) for k, v in m["sections"].items()},
+        "calls": {k: {"n": n, "ms": round(sec * 1000, 1)} for k, (n, sec) in m["calls"].items()},
+    }
+    path = _metrics_log_path()
+    if path:
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        except Exception:
+            pass  # الـ log اختياري، ما يطيّحش الصفحة
+    return summary
@@ -0,0 +1,211 @@
+"""Local SQLite mirror (اختياري): قراءة كان Google Sheets طايح + outbox للـ appends."""
+import json
+import sqlite3
+import time
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from .runtime import _log, process_store, setting
+from .schema import (
+    ABSENCES_COLS,
+    ABSENCES_SHEET,
+    BOOL_COLS,
+    NOTIF_LOG_COLS,
+    NOTIF_LOG_SHEET,
+    SUBJECTS_COLS,
+    SUBJECTS_SHEET,
+    TRAINEES_COLS,
+    TRAINEES_SHEET,
+)
+from .gsheets import _apierr_details, ensure_ws, safe_append_rows
+from .frames import typed_frame
+from .storage import (
+    _appended_first_row,
+    _frame_stamp,
+    _load_sheet_shared,
+    _row_index_appended,
+    invalidate_sheet,
+    prefetch_sheets,
+)
+
+
+# ================== Local SQLite mirror (اختياري) ==================
+# read engine محلي: نسخة typed من الشيتات الأربعة (sqlite3 من الـ stdlib)، تتحدّث في background.
+# كان Google Sheets طايح (quota / 5xx): القراءة تخدم من الـ mirror، والـ appends تتحط في outbox
+# وتتبعث للشيت في الـ sync الجاي. يتفعّل بـ ATTENDANCEHUB_LOCAL_DB ولا secrets.LOCAL_DB_PATH.
+MIRROR_SYNC_SEC = 60
+
+MIRROR_SHEETS = {
+    TRAINEES_SHEET: TRAINEES_COLS,
+    SUBJECTS_SHEET: SUBJECTS_COLS,
+    ABSENCES_SHEET: ABSENCES_COLS,
+    NOTIF_LOG_SHEET: NOTIF_LOG_COLS,
+}
+MIRROR_REAL_COLS = {"heures_totales", "heures_semaine", "heures_absence"}
+MIRROR_DATE_COLS = {"date", "date_debut", "period_from", "period_to"}
+MIRROR_INDEXED_COLS = ["trainee_id", "subject_id", "branche", "date"]
+
+
+def _mirror_path() -> str:
+    return setting("LOCAL_DB_PATH", "ATTENDANCEHUB_LOCAL_DB")
+
+
+def _mirror_schema_sql(sheet_name: str, cols: list[str]) -> list[str]:
+    col_defs = []
+    for c in cols:
+        typ = "REAL" if c in MIRROR_REAL_COLS else "DATE" if c in MIRROR_DATE_COLS else "TEXT"
+        col_defs.append(f'"{c}" {typ}' + (" PRIMARY KEY" if c == "id" else ""))
+
+    stmts = [f'CREATE TABLE IF NOT EXISTS "{sheet_name}" ({", ".join(col_defs)})']
+    for c in MIRROR_INDEXED_COLS:
+        if c in cols:
+            stmts.append(f'CREATE INDEX IF NOT EXISTS "ix_{sheet_name}_{c}" ON "{sheet_name}" ("{c}")')
+    return stmts
+
+
+@process_store
+def _local_mirror():
+    path = _mirror_path()
+    if not path:
+        return None
+
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        for sheet_name, cols in MIRROR_SHEETS.items():
+            for sql in _mirror_schema_sql(sheet_name, cols):
+                conn.execute(sql)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS _outbox ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, sheet TEXT, row TEXT, queued_at TEXT)"
+        )
+        # آخر pull ناجح لكل شيت: جدول ما تعبّاش من الشيت عمرو = ما فيهش بيانات نثقو فيها
+        conn.execute("CREATE TABLE IF NOT EXISTS _synced (sheet TEXT PRIMARY KEY, synced_at TEXT)")
+
+    mirror = {"conn": conn, "lock": threading.RLock(), "synced": {}}
+    threading.Thread(target=_mirror_sync_loop, args=(mirror,), daemon=True, name="mirror-sync").start()
+    return mirror
+
+
+def _mirror_typed_rows(sheet_name: str, rows: list[list[str]]) -> list[tuple]:
+    cols = MIRROR_SHEETS[sheet_name]
+    df = pd.DataFrame(rows, columns=cols).fillna("").astype(str)
+    for c in cols:
+        if c in MIRROR_REAL_COLS:
+            df[c] = pd.to_numeric(df[c].str.replace(",", ".").str.strip(), errors="coerce").fillna(0.0)
+        elif c in MIRROR_DATE_COLS:
+            d = pd.to_datetime(df[c], errors="coerce")
+            df[c] = d.dt.strftime("%Y-%m-%d").where(d.notna(), None)
+    return list(df.astype(object).itertuples(index=False, name=None))
+
+
+def _mirror_insert(conn, sheet_name: str, rows: list[list[str]]):
+    cols = MIRROR_SHEETS[sheet_name]
+    conn.executemany(
+        f'INSERT OR REPLACE INTO "{sheet_name}" VALUES ({", ".join("?" * len(cols))})',
+        _mirror_typed_rows(sheet_name, rows),
+    )
+
+
+def _mirror_replace(mirror: dict, sheet_name: str, df: pd.DataFrame):
+    cols = MIRROR_SHEETS[sheet_name]
+    df = df.reindex(columns=cols, fill_value="")
+    for c, true_value in BOOL_COLS.items():
+        # الـ snapshot typed (bool) -> نفس القيمة متاع الشيت، باش typed_frame يقراها كيف هي
+        if c in cols and df[c].dtype == bool:
+            df[c] = df[c].map({True: true_value, False: ""})
+    rows = df.values.tolist()
+    with mirror["lock"], mirror["conn"] as conn:
+        conn.execute(f'DELETE FROM "{sheet_name}"')
+        _mirror_insert(conn, sheet_name, rows)
+        # الأسطر اللي مازالت في الـ outbox (ما وصلتش للشيت) تقعد ظاهرة محليًا
+        pending = conn.execute("SELECT row FROM _outbox WHERE sheet = ? ORDER BY seq", (sheet_name,)).fetchall()
+        if pending:
+            _mirror_insert(conn, sheet_name, [json.loads(r[0]) for r in pending])
+        conn.execute(
+            "INSERT OR REPLACE INTO _synced (sheet, synced_at) VALUES (?, ?)",
+            (sheet_name, datetime.utcnow().isoformat()),
+        )
+
+
+def mirror_read(sheet_name: str):
+    """
+    DataFrame typed (كيف typed_frame) من الـ mirror.
+    None كان الـ mirror مطفي ولا الشيت هذا ما تعمللوش sync عمرو (جدول فارغ موش بيانات).
+    """
+    mirror = _local_mirror()
+    if mirror is None or sheet_name not in MIRROR_SHEETS:
+        return None
+
+    with mirror["lock"]:
+        if mirror["conn"].execute("SELECT 1 FROM _synced WHERE sheet = ?", (sheet_name,)).fetchone() is None:
+            return None
+        df = pd.read_sql_query(f'SELECT * FROM "{sheet_name}"', mirror["conn"])
+    return typed_frame(df.astype(object).where(df.notna(), "").astype(str))
+
+
+def mirror_enqueue_appends(sheet_name: str, rows: list[list[str]]) -> bool:
+    mirror = _local_mirror()
+    if mirror is None or sheet_name not in MIRROR_SHEETS:
+        return False
+    queued_at = datetime.utcnow().isoformat()
+    with mirror["lock"], mirror["conn"] as conn:
+        conn.executemany(
+            "INSERT INTO _outbox (sheet, row, queued_at) VALUES (?, ?, ?)",
+            [(sheet_name, json.dumps(r, ensure_ascii=False), queued_at) for r in rows],
+        )
+        _mirror_insert(conn, sheet_name, rows)
+    return True
+
+
+def mirror_push_outbox() -> int:
+    mirror = _local_mirror()
+    if mirror is None:
+        return 0
+    with mirror["lock"]:
+        pending = mirror["conn"].execute("SELECT seq, sheet, row FROM _outbox ORDER BY seq").fetchall()
+    if not pending:
+        return 0
+
+    by_sheet = {}
+    for seq, sheet_name, row in pending:
+        by_sheet.setdefault(sheet_name, []).append((seq, json.loads(row)))
+
+    pushed = 0
+    for sheet_name, items in by_sheet.items():
+        cols = MIRROR_SHEETS[sheet_name]
+        rows = [r for _, r in items]
+        ws = ensure_ws(sheet_name, cols)
+        resp = safe_append_rows(ws, rows)
+        _row_index_appended(ws, cols, _appended_first_row(resp), rows)
+        with mirror["lock"], mirror["conn"] as conn:
+            conn.executemany("DELETE FROM _outbox WHERE seq = ?", [(seq,) for seq, _ in items])
+        # الأسطر كانت مطبّقة محليًا (write-through) وقت الـ enqueue -> هنا refetch عادي
+        invalidate_sheet(sheet_name)
+        pushed += len(rows)
+    return pushed
+
+
+def mirror_sync_once(mirror: dict):
+    """push الـ outbox، ومن بعد pull: كل شيت تبدّل الـ snapshot متاعو يتكتب في الـ mirror."""
+    mirror_push_outbox()
+    prefetch_sheets(MIRROR_SHEETS.items())
+    for sheet_name, cols in MIRROR_SHEETS.items():
+        df = _load_sheet_shared(sheet_name, cols)
+        stamp = _frame_stamp(sheet_name)
+        if stamp is not None and mirror["synced"].get(sheet_name) == stamp:
+            continue
+        _mirror_replace(mirror, sheet_name, df)
+        mirror["synced"][sheet_name] = stamp
+
+
+def _mirror_sync_loop(mirror: dict):
+    while True:
+        try:
+            mirror_sync_once(mirror)
+        except Exception as e:
+            # thread في الخلفية: logging مباشرة (notify ينجم يمشي لـ st.* اللي ما يخدمش برّا الـ session)
+            _log.warning("[mirror-sync] %s: %s", type(e).__name__, _apierr_details(e))
+        time.sleep(MIRROR_SYNC_SEC)
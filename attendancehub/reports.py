@@ -0,0 +1,162 @@
+"""Reports: روابط واتساب (تجاوز 10٪ + إعلام حسب المدة) لفرع كامل، مشتركة بين Tab4 والـ CLI."""
+from datetime import date, timedelta
+
+import pandas as pd
+
+from .analytics import (
+    EXCEED_LABEL_PREFIX,
+    build_whatsapp_messages_for_trainees,
+    enriched_absences,
+    exceedance_table,
+    notification_key,
+    notified_index,
+)
+from .messaging import build_exceed_10pct_message_one, normalize_phone, wa_link
+from .storage import load_subjects, load_trainees, notification_log_rec
+
+# قيم عمود target في Notifications_Log
+TARGETS = ("Trainee", "Parent")
+REPORT_COLS = [
+    "kind", "branche", "trainee_id", "nom", "specialite", "target", "phone",
+    "period_from", "period_to", "period_label", "n_exceeded", "already_sent", "message", "link",
+]
+
+
+# ================== الفترة ==================
+def period_range(kind: str, day: date | None = None, d_from: date | None = None, d_to: date | None = None):
+    """
+    kind: day / week / month / custom -> (d_from, d_to, period_label) كيف Tab4.
+    day = اليوم، بداية الأسبوع، ولا أي يوم من الشهر (default اليوم). custom: d_from / d_to.
+    """
+    day = day or date.today()
+    if kind == "day":
+        return day, day, f"بتاريخ {day.strftime('%Y-%m-%d')}"
+    if kind == "week":
+        d_from, d_to = day, day + timedelta(days=6)
+        return d_from, d_to, f"من {d_from.strftime('%Y-%m-%d')} إلى {d_to.strftime('%Y-%m-%d')}"
+    if kind == "month":
+        first = day.replace(day=1)
+        next_first = first.replace(year=first.year + 1, month=1) if first.month == 12 else first.replace(month=first.month + 1)
+        d_from, d_to = first, next_first - timedelta(days=1)
+        return d_from, d_to, f"من {d_from.strftime('%Y-%m-%d')} إلى {d_to.strftime('%Y-%m-%d')} (شهر كامل)"
+    if kind == "custom":
+        d_from = d_from or day - timedelta(days=7)
+        d_to = d_to or day
+        if d_to < d_from:
+            d_from, d_to = d_to, d_from
+        return d_from, d_to, f"من {d_from.strftime('%Y-%m-%d')} إلى {d_to.strftime('%Y-%m-%d')}"
+    raise ValueError(f"نوع فترة غير معروف: {kind}")
+
+
+# ================== Links ==================
+def _target_phone(tel: str, tel_parent: str, target: str) -> str:
+    return normalize_phone(tel if target == "Trainee" else tel_parent)
+
+
+def _mark_sent(rows: list[dict], skip_sent: bool) -> list[dict]:
+    # already_sent: نفس المفتاح (notification_key: 10٪ بلا تاريخ، المدة بالفترة) موجود في السجل
+    sent = notified_index()
+    for r in rows:
+        r["already_sent"] = notification_key(
+            r["trainee_id"], r["target"], r["branche"], r["period_from"], r["period_to"], r["period_label"]
+        ) in sent
+    return [r for r in rows if not r["already_sent"]] if skip_sent else rows
+
+
+def exceed_notifications(branch: str, target: str, remedial_month: str, df_tr_b, df_sub_b, df_abs_b,
+                         skip_sent: bool = True) -> list[dict]:
+    """
+    رسالة واحدة لكل متكوّن فات 10٪ (فيها كل المواد) — target: Trainee / Parent.
+    skip_sent: اللي تبعثلهم إشعار 10٪ قبل (في أي نهار) ما يرجعوش (ولا يرجعو بـ already_sent).
+    """
+    exceeded, _ = exceedance_table(branch, df_tr_b, df_sub_b, df_abs_b)
+    today = date.today()
+    label = f"{EXCEED_LABEL_PREFIX} (مجمّع) + تدارك {remedial_month}"
+
+    rows = []
+    for trainee_id, g in exceeded.groupby("trainee_id", sort=False):
+        phone = _target_phone(str(g["tel"].iloc[0] or ""), str(g["tel_parent"].iloc[0] or ""), target)
+        if not phone:
+            continue
+        items = [
+            {"matiere": str(m), "total_abs": float(t), "limit_10": float(lim), "excess": float(e), "heures_tot": float(h)}
+            for m, t, lim, e, h in zip(g["matiere"], g["total_abs"], g["limit_10"], g["excess"], g["heures_tot"])
+        ]
+        nom, spec = str(g["nom"].iloc[0]), str(g["spec"].iloc[0] or "")
+        msg = build_exceed_10pct_message_one(
+            trainee_name=nom, branch_name=branch, spec=spec, items=items, remedial_month=remedial_month,
+        )
+        rows.append({
+            "kind": "exceed_10pct", "branche": branch, "trainee_id": str(trainee_id), "nom": nom, "specialite": spec,
+            "target": target, "phone": phone, "period_from": today, "period_to": today, "period_label": label,
+            "n_exceeded": len(items), "message": msg, "link": wa_link(phone, msg),
+        })
+    return _mark_sent(rows, skip_sent)
+
+
+def period_notifications(branch: str, target: str, d_from: date, d_to: date, period_label: str,
+                         df_tr, df_abs_b, df_sub_all, skip_sent: bool = True) -> list[dict]:
+    """إعلام الغيابات في الفترة لكل متكوّن من df_tr عندو غيابات (جماعي Tab4). skip_sent كيف فوق."""
+    msgs = build_whatsapp_messages_for_trainees(df_tr, df_abs_b, df_sub_all, branch, d_from, d_to, period_label)
+
+    rows = []
+    for tid, nom, spec, tel, tel_p in zip(df_tr["id"], df_tr["nom"], df_tr["specialite"], df_tr["telephone"], df_tr["tel_parent"]):
+        phone = _target_phone(tel, tel_p, target)
+        if not phone:
+            continue
+        msg, _ = msgs.get(tid, ("", []))
+        if not msg:
+            continue
+        rows.append({
+            "kind": "period", "branche": branch, "trainee_id": str(tid), "nom": str(nom), "specialite": str(spec or ""),
+            "target": target, "phone": phone, "period_from": d_from, "period_to": d_to, "period_label": period_label,
+            "n_exceeded": "", "message": msg, "link": wa_link(phone, msg),
+        })
+    return _mark_sent(rows, skip_sent)
+
+
+def log_recs(rows: list[dict]) -> list[dict]:
+    """أسطر Notifications_Log متاع الروابط الجديدة برك (append_notification_logs واحد)."""
+    return [
+        notification_log_rec(
+            trainee_id=r["trainee_id"], phone=r["phone"], target=r["target"], branche=r["branche"],
+            period_from=r["period_from"], period_to=r["period_to"], period_label=r["period_label"],
+        )
+        for r in rows
+        if not r.get("already_sent")
+    ]
+
+
+# ================== Report (فرع كامل، بلا UI) ==================
+def branch_report(branch: str, target: str, kinds=("exceed_10pct", "period"), period=None,
+                  remedial_month: str = "جويلية", spec: str | None = None, skip_sent: bool = True) -> list[dict]:
+    """
+    الروابط الكل متاع فرع: period = (d_from, d_to, label) من period_range.
+    الشيتات يتقراو من الـ snapshots المشتركة (prefetch_sheets قبل = طلب API واحد).
+    """
+    df_tr_all, df_sub_all = load_trainees(), load_subjects()
+    df_tr_b = df_tr_all[df_tr_all["branche"] == branch]
+    df_sub_b = df_sub_all[df_sub_all["branche"] == branch]
+    df_abs_b = enriched_absences(branch)
+    if df_tr_b.empty or df_sub_b.empty or df_abs_b.empty:
+        return []
+
+    rows = []
+    if "exceed_10pct" in kinds:
+        # exceedance_table يتخزّن بالفرع: نعطيوه الفرع كامل ونفلترو التخصّص بعد
+        rows += [
+            r for r in exceed_notifications(branch, target, remedial_month, df_tr_b, df_sub_b, df_abs_b, skip_sent)
+            if not spec or r["specialite"] == spec
+        ]
+    if "period" in kinds and period is not None:
+        d_from, d_to, label = period
+        df_tr = df_tr_b[df_tr_b["specialite"] == spec] if spec else df_tr_b
+        rows += period_notifications(branch, target, d_from, d_to, label, df_tr, df_abs_b, df_sub_all, skip_sent)
+    return rows
+
+
+def report_frame(rows: list[dict]) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=REPORT_COLS)
+    for c in ("period_from", "period_to"):
+        df[c] = df[c].map(lambda d: d.strftime("%Y-%m-%d"))
+    return df
@@ -0,0 +1,60 @@
+"""حالة process-wide + إعدادات + hooks للـ UI — بلا Streamlit (الـ app، الـ CLI والـ benchmarks يتقاسموها)."""
+import functools
+import logging
+import os
+import threading
+
+_log = logging.getLogger("attendancehub")
+
+
+# ================== Process stores (بدل st.cache_resource) ==================
+# instance وحدة لكل process (مشتركة بين الـ sessions / الـ threads)، تتبنى أول مرة تحت lock.
+_stores: list[dict] = []
+
+
+def process_store(build):
+    lock = threading.Lock()
+    box: dict = {}
+
+    @functools.wraps(build)
+    def get():
+        if "value" not in box:
+            with lock:
+                if "value" not in box:
+                    box["value"] = build()
+        return box["value"]
+
+    _stores.append(box)
+    return get
+
+
+def reset_stores():
+    """ينسى الـ stores الكل (benchmarks: شيت جديد = process جديد)."""
+    for box in _stores:
+        box.clear()
+
+
+# ================== Settings ==================
+# env vars أولويتها أعلى؛ الـ app يعمّر الباقي من st.secrets (configure) وقت الـ main().
+SETTINGS: dict = {}
+
+
+def configure(**values):
+    SETTINGS.update({k: v for k, v in values.items() if v not in (None, "")})
+
+
+def setting(name: str, env: str, default: str = "") -> str:
+    return os.environ.get(env, "") or str(SETTINGS.get(name, default) or "")
+
+
+# ================== UI hooks ==================
+# الـ core ما يرسم شي: الأخطاء/التحذيرات تمشي للـ logging، والـ app يركّب st.error / st.warning.
+UI_HOOKS = {"error": _log.error, "warning": _log.warning}
+
+
+def set_ui_hooks(**hooks):
+    UI_HOOKS.update(hooks)
+
+
+def notify(level: str, msg: str):
+    UI_HOOKS.get(level, _log.info)(msg)
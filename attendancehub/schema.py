@@ -0,0 +1,54 @@
+"""أسماء الشيتات والأعمدة وأنواعها."""
+
+
+# ================== إعداد Google Sheets ==================
+SCOPE = ["https://www.googleapis.com/auth/spreadsheets"]
+
+# أسماء الشيتات
+TRAINEES_SHEET = "Trainees"
+SUBJECTS_SHEET = "Subjects"
+ABSENCES_SHEET = "Absences"
+NOTIF_LOG_SHEET = "Notifications_Log"
+
+BRANCHES = ["Menzel Bourguiba", "Bizerte"]
+
+TRAINEES_COLS = ["id", "nom", "telephone", "tel_parent", "branche", "specialite", "date_debut", "actif"]
+
+SUBJECTS_COLS = [
+    "id",
+    "nom_matiere",
+    "branche",
+    "specialites",  # قائمة تخصّصات مفصولة بفاصلة
+    "heures_totales",
+    "heures_semaine",
+]
+
+ABSENCES_COLS = ["id", "trainee_id", "subject_id", "date", "heures_absence", "justifie", "commentaire"]
+
+NOTIF_LOG_COLS = [
+    "id",
+    "trainee_id",
+    "phone",
+    "target",       # Trainee / Parent
+    "branche",
+    "period_from",
+    "period_to",
+    "period_label",
+    "sent_at_iso",  # تاريخ ووقت الإرسال (UTC ISO)
+]
+
+# الشيتات الأربعة (prefetch_sheets: values.batchGet واحد)
+ALL_SHEETS = [
+    (TRAINEES_SHEET, TRAINEES_COLS),
+    (SUBJECTS_SHEET, SUBJECTS_COLS),
+    (ABSENCES_SHEET, ABSENCES_COLS),
+    (NOTIF_LOG_SHEET, NOTIF_LOG_COLS),
+]
+
+# ✅ أنواع الأعمدة: تتحوّل مرة وحدة وقت الـ load (typed_frame) والـ snapshot المخزّن typed
+FLOAT_COLS = {"heures_totales", "heures_semaine", "heures_absence"}  # float64 (float32 يبدّل 1.1 وحدود الـ 10٪)
+DATE_COLS = {"date"}                                                 # datetime64 (NaT كان غالطة)
+CATEGORY_COLS = {"branche", "specialite", "subject_id", "trainee_id"}
+# bool: القيمة اللي تعني True في كل عمود (كيف قبل: strip() == القيمة بالضبط، الباقي False)
+JUSTIFIED = "Oui"
+BOOL_COLS = {"justifie": JUSTIFIED, "actif": "1"}
@@ -0,0 +1,767 @@
+"""Storage: row index، snapshots مشتركة + incremental sync، كتابات batched، CRUD وload_*."""
+import bisect
+import hashlib
+import uuid
+import threading
+from contextlib import contextmanager
+from datetime import datetime, date
+
+import pandas as pd
+import gspread.exceptions as gse
+from gspread.utils import a1_to_rowcol, fill_gaps, rowcol_to_a1
+
+from .runtime import notify, process_store
+from .schema import (
+    ABSENCES_COLS,
+    ABSENCES_SHEET,
+    NOTIF_LOG_COLS,
+    NOTIF_LOG_SHEET,
+    SUBJECTS_COLS,
+    SUBJECTS_SHEET,
+    TRAINEES_COLS,
+    TRAINEES_SHEET,
+)
+from .metrics import metrics_cache, timed_call
+from .gsheets import (
+    _apierr_details,
+    _is_transient,
+    _now_ts,
+    check_header_from_values,
+    ensure_ws,
+    get_spreadsheet,
+    get_ws_map,
+    safe_append_rows,
+    safe_batch_get,
+    safe_batch_update,
+    safe_batch_update_values,
+    safe_get_all_values,
+    safe_values_batch_get,
+    SheetsUnavailable,
+)
+from .frames import _concat_typed, typed_frame
+
+
+# ================== id → row index (بدل get_all_values كامل مع كل حذف/تعديل) ==================
+ROW_INDEX_TTL_SEC = 300
+ROW_INDEX_MAX_VERIFY_RUNS = 50
+
+
+@process_store
+def _row_index_store() -> dict:
+    # process-wide (مشترك بين الـ sessions): {ws.id: {"ids", "branches", "last_row", "at"}}
+    return {"lock": threading.RLock(), "by_ws": {}}
+
+
+def _col_letter(cols: list[str], field: str) -> str:
+    return rowcol_to_a1(1, cols.index(field) + 1).rstrip("0123456789")
+
+
+def _build_row_index(id_values: list[str], branch_values) -> dict:
+    """id_values / branch_values: قيم العمود من السطر 1 (header) للآخر."""
+    ids = {}
+    for row, rid in enumerate(id_values[1:], start=2):
+        if rid:
+            ids.setdefault(rid, row)
+
+    branches = {}
+    for row, b in enumerate((branch_values or [])[1:], start=2):
+        if b:
+            branches.setdefault(b, []).append(row)
+
+    return {
+        "ids": ids,
+        "branches": branches,
+        "last_row": max(len(id_values), len(branch_values or [])),
+        "at": _now_ts(),
+    }
+
+
+def remember_row_index(ws, vals: list[list[str]]):
+    """يتبنى من نفس الـ snapshot اللي جابو load_* (بلا حتى call زايدة)."""
+    if not vals:
+        return
+    header = vals[0]
+    if "id" not in header:
+        return
+    id_idx = header.index("id")
+    b_idx = header.index("branche") if "branche" in header else None
+
+    id_values = [r[id_idx] if len(r) > id_idx else "" for r in vals]
+    branch_values = [r[b_idx] if len(r) > b_idx else "" for r in vals] if b_idx is not None else None
+
+    store = _row_index_store()
+    with store["lock"]:
+        store["by_ws"][ws.id] = _build_row_index(id_values, branch_values)
+
+
+def _revalidate_row_index(ws, cols: list[str]) -> dict:
+    # ✅ قراءة خفيفة: عمود id (A:A) + عمود branche برك، في call واحدة
+    ranges = [f"{_col_letter(cols, 'id')}:{_col_letter(cols, 'id')}"]
+    if "branche" in cols:
+        b = _col_letter(cols, "branche")
+        ranges.append(f"{b}:{b}")
+
+    res = safe_batch_get(ws, ranges)
+    id_values = [r[0] if r else "" for r in res[0]]
+    branch_values = [r[0] if r else "" for r in res[1]] if len(res) > 1 else None
+
+    entry = _build_row_index(id_values, branch_values)
+    store = _row_index_store()
+    with store["lock"]:
+        store["by_ws"][ws.id] = entry
+    return entry
+
+
+def _row_index(ws, cols: list[str], force_refresh: bool = False) -> dict:
+    store = _row_index_store()
+    with store["lock"]:
+        entry = store["by_ws"].get(ws.id)
+    if force_refresh or entry is None or (_now_ts() - entry["at"]) >= ROW_INDEX_TTL_SEC:
+        entry = _revalidate_row_index(ws, cols)
+    return entry
+
+
+def _row_index_appended(ws, cols: list[str], first_row, rows: list[list[str]]):
+    store = _row_index_store()
+    with store["lock"]:
+        entry = store["by_ws"].get(ws.id)
+        if entry is None:
+            return
+        if first_row is None:
+            first_row = entry["last_row"] + 1
+
+        id_idx = cols.index("id")
+        b_idx = cols.index("branche") if "branche" in cols else None
+        for k, r in enumerate(rows):
+            row = first_row + k
+            if r[id_idx]:
+                entry["ids"].setdefault(r[id_idx], row)
+            if b_idx is not None and r[b_idx]:
+                entry["branches"].setdefault(r[b_idx], []).append(row)
+        entry["last_row"] = max(entry["last_row"], first_row + len(rows) - 1)
+
+
+def _row_index_deleted(ws, deleted_rows):
+    deleted = sorted(set(deleted_rows))
+    if not deleted:
+        return
+    gone = set(deleted)
+
+    def shift(row: int) -> int:
+        return row - bisect.bisect_left(deleted, row)
+
+    store = _row_index_store()
+    with store["lock"]:
+        entry = store["by_ws"].get(ws.id)
+        if entry is None:
+            return
+        entry["ids"] = {rid: shift(row) for rid, row in entry["ids"].items() if row not in gone}
+        entry["branches"] = {
+            b: [shift(row) for row in rows if row not in gone]
+            for b, rows in entry["branches"].items()
+        }
+        entry["last_row"] -= len(deleted)
+
+
+def _row_index_forget(ws):
+    store = _row_index_store()
+    with store["lock"]:
+        store["by_ws"].pop(ws.id, None)
+
+
+def _appended_first_row(resp):
+    # append_rows يرجّع updates.updatedRange مثل "'Absences'!A602:G1201"
+    try:
+        rng = resp["updates"]["updatedRange"].split("!")[-1].split(":")[0]
+        return a1_to_rowcol(rng)[0]
+    except Exception:
+        return None
+
+
+def _rows_still_match(ws, cols: list[str], field: str, expected: dict) -> bool:
+    """تحقّق خفيف (batch_get على الخلايا المعنية برك) قبل ما نكتب/نحذف."""
+    runs = _contiguous_runs(expected)
+    if len(runs) > ROW_INDEX_MAX_VERIFY_RUNS:
+        return False  # برشا ranges: أخف نعاودو نقراو العمود الكل
+
+    col = _col_letter(cols, field)
+    res = safe_batch_get(ws, [f"{col}{a}:{col}{b}" for a, b in runs])
+    for (a, b), vr in zip(runs, res):
+        for k, row in enumerate(range(a, b + 1)):
+            got = vr[k][0] if k < len(vr) and vr[k] else ""
+            if got != expected[row]:
+                return False
+    return True
+
+
+def _resolve_rows(ws, cols: list[str], field: str, values: set) -> dict:
+    """{رقم السطر: القيمة} للأسطر اللي فيها field (id ولا branche) ∈ values."""
+
+    def lookup(entry: dict) -> dict:
+        if field == "id":
+            return {entry["ids"][v]: v for v in values if v in entry["ids"]}
+        return {row: v for v in values for row in entry["branches"].get(v, [])}
+
+    entry = _row_index(ws, cols)
+    found = lookup(entry)
+    if found and _rows_still_match(ws, cols, field, found):
+        return found
+
+    # index قديم (تبدّل الشيت من برّا) -> نعاودو نبنيوه من A:A ونثقو فيه
+    return lookup(_row_index(ws, cols, force_refresh=True))
+
+
+# ================== Per-sheet cache versions (بدل st.cache_data.clear() للكل) ==================
+DATA_TTL_SEC = 300
+WRITE_THROUGH = True
+
+# ✅ Incremental sync (شيتات append-mostly): خلية last_modified برّا أعمدة الـ schema،
+# تتبدّل مع كل تعديل/حذف من التطبيق. كان ما تبدّلتش -> نجيبو كان الأسطر الجديدة.
+# H1 = العمود اللي بعد آخر header (ABSENCES_COLS = 7)، داخل الـ grid (ensure_ws يصنع 8 أعمدة على الأقل)
+SHEET_META_CELLS = {ABSENCES_SHEET: "H1"}
+# تعديلات يدوية في الشيت ما تبدّلش الخلية: full reload كل DATA_TTL_SEC كيف قبل (نفس الـ freshness)،
+# وبين الزوز الأسطر الجديدة تتجاب كل INCREMENTAL_TTL_SEC بـ call خفيفة (خلية + الذيل).
+FULL_RESYNC_SEC = DATA_TTL_SEC
+INCREMENTAL_TTL_SEC = 60
+
+
+def _new_meta_token() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _row_checksum(row) -> str:
+    return hashlib.sha1("\x1f".join(str(x) for x in row).encode("utf-8")).hexdigest()
+
+
+@process_store
+def _sheet_cache_store() -> dict:
+    # process-wide snapshots (مشتركة بين الـ sessions):
+    # versions = {sheet: int}, frames = {sheet: {"version", "df", "at", "sync"}}, fetch_locks = {sheet: Lock}
+    # sync (SHEET_META_CELLS برك) = {"n_rows", "tail_sum", "meta", "full_at"}
+    return {"lock": threading.RLock(), "versions": {}, "frames": {}, "fetch_locks": {}}
+
+
+def _sheet_fetch_lock(sheet_name: str) -> threading.Lock:
+    store = _sheet_cache_store()
+    with store["lock"]:
+        return store["fetch_locks"].setdefault(sheet_name, threading.Lock())
+
+
+def sheet_version(sheet_name: str) -> int:
+    store = _sheet_cache_store()
+    with store["lock"]:
+        return store["versions"].get(sheet_name, 0)
+
+
+def _remember_frame(sheet_name: str, version: int, df: pd.DataFrame, sync=None):
+    store = _sheet_cache_store()
+    with store["lock"]:
+        cur = store["frames"].get(sheet_name)
+        if cur is not None and cur["version"] > version:
+            return
+        if version != store["versions"].get(sheet_name, 0):
+            return  # كتابة صارت وقت الـ fetch -> الـ snapshot هذا قديم
+        store["frames"][sheet_name] = {"version": version, "df": df, "at": _now_ts(), "sync": sync}
+
+
+def _cached_frame(sheet_name: str, version: int):
+    store = _sheet_cache_store()
+    with store["lock"]:
+        cur = store["frames"].get(sheet_name)
+    ttl = INCREMENTAL_TTL_SEC if cur is not None and cur.get("sync") else DATA_TTL_SEC
+    if cur is None or cur["version"] != version or (_now_ts() - cur["at"]) >= ttl:
+        return None
+    return cur["df"]
+
+
+def _frame_stamp(sheet_name: str):
+    # يتبدّل كل ما الـ snapshot تبدّل (fetch جديد ولا write-through)
+    store = _sheet_cache_store()
+    with store["lock"]:
+        cur = store["frames"].get(sheet_name)
+    return None if cur is None else (cur["version"], cur["at"])
+
+
+def _stale_frame(sheet_name: str, version: int):
+    # نفس الـ version أما فات الـ TTL: base للـ incremental sync
+    store = _sheet_cache_store()
+    with store["lock"]:
+        cur = store["frames"].get(sheet_name)
+    if cur is None or cur["version"] != version:
+        return None
+    return cur
+
+
+def _write_through(cur, v: int, appended_rows=None, cols=None, deleted=None, meta=None):
+    # snapshot الـ version v + التغيير -> frame متاع v + 1 (ولا None: الـ load الجاي يجيب الشيت)
+    if not WRITE_THROUGH or cur is None or cur["version"] != v:
+        return None
+    if (_now_ts() - cur["at"]) >= DATA_TTL_SEC:
+        return None
+
+    df = cur["df"]
+    sync = dict(cur["sync"]) if cur.get("sync") else None
+    if appended_rows is not None and cols is not None:
+        if not set(cols).issubset(df.columns):
+            return None
+        df_new = typed_frame(pd.DataFrame(appended_rows, columns=cols).reindex(columns=df.columns, fill_value=""))
+        df = _concat_typed(df, df_new)
+        if sync:
+            sync["n_rows"] += len(appended_rows)
+            sync["tail_sum"] = _row_checksum(appended_rows[-1])
+    elif deleted is not None:
+        field, values = deleted
+        if field not in df.columns:
+            return None
+        n_before = len(df)
+        tail_kept = n_before > 0 and df[field].iloc[-1] not in values
+        df = df[~df[field].isin(values)].reset_index(drop=True)
+        # tail_sum محسوب على strings الشيت: يقعد صالح كان آخر سطر ما تحذفش
+        if sync and meta is not None and tail_kept:
+            sync["n_rows"] -= n_before - len(df)
+            sync["meta"] = meta
+        else:
+            sync = None
+    else:
+        return None
+
+    return {"version": v + 1, "df": df, "at": cur["at"], "sync": sync}
+
+
+def invalidate_sheet(sheet_name: str, appended_rows=None, cols=None, deleted=None, meta=None, updated=None):
+    """
+    تبدّل version الشيت هذا برك (الشيتات الأخرى يقعدو في الكاش).
+    write-through: كان عندنا الـ DataFrame متاع الـ version الحالي، نطبّقو عليه التغيير
+    محليًا (append: نزيدو الأسطر، delete: deleted = (field, values)) بلا ما نعاودو نجيبو الشيت.
+    meta: القيمة الجديدة متاع خلية last_modified (كان الحذف كتبها).
+    updated: [(rec_id, {field: value})] (ما يتطبّقش على الـ DataFrame، برك على الـ aggregates).
+    """
+    from .analytics import _exceed_absences_written, _notified_written  # analytics / mirror مبنيين فوق storage: import وقت الاستعمال
+
+    store = _sheet_cache_store()
+    with store["lock"]:
+        v = store["versions"].get(sheet_name, 0)
+        store["versions"][sheet_name] = v + 1
+        cur = store["frames"].pop(sheet_name, None)
+        entry = _write_through(cur, v, appended_rows, cols, deleted, meta)
+        if entry is not None:
+            store["frames"][sheet_name] = entry
+
+    # الـ aggregates برّا الـ lock (عندهم locks متاعهم: ما نركّبوش الزوز).
+    # before / after: stamps الـ snapshot قبل وبعد الكتابة؛ after None = ما فماش write-through.
+    before = (cur["version"], cur["at"]) if cur is not None and cur["version"] == v else None
+    after = (entry["version"], entry["at"]) if entry is not None else None
+    if sheet_name == ABSENCES_SHEET:
+        _exceed_absences_written(before, after, appended_rows, cols, deleted, updated)
+    elif sheet_name == NOTIF_LOG_SHEET:
+        _notified_written(before, after, appended_rows, cols)
+
+
+# ================== Batched writes (append_rows واحد لكل شيت) ==================
+_write_buffer = threading.local()
+
+
+def _flush_appends(pending: dict):
+    from .mirror import mirror_enqueue_appends
+
+    for sheet_name, entry in pending.items():
+        if not entry["rows"]:
+            continue
+        try:
+            ws = ensure_ws(sheet_name, entry["cols"])
+            resp = safe_append_rows(ws, entry["rows"])
+        except (gse.APIError, SheetsUnavailable) as e:
+            # quota / 5xx بعد الـ retries ولا breaker محلول: كان الـ mirror المحلي مفعّل، الأسطر تستنى في الـ outbox
+            if not (_is_transient(e) and mirror_enqueue_appends(sheet_name, entry["rows"])):
+                raise
+        else:
+            _row_index_appended(ws, entry["cols"], _appended_first_row(resp), entry["rows"])
+        invalidate_sheet(sheet_name, appended_rows=entry["rows"], cols=entry["cols"])
+
+
+@contextmanager
+def buffered_writes():
+    """
+    كل append_record / append_records داخل البلوك يتجمّعو،
+    وعند الخروج يتبعثو append_rows واحد لكل شيت + invalidate مرة وحدة لكل شيت.
+    كان البلوك طلّع exception: الأسطر المجمّعة تتلغى (ما نكتبوش نص عملية) والـ exception يطلع كيف هو.
+    """
+    if getattr(_write_buffer, "pending", None) is not None:
+        # nested: البلوك الخارجي هو اللي يعمل flush
+        yield
+        return
+
+    pending = {}
+    _write_buffer.pending = pending
+    try:
+        yield
+    finally:
+        _write_buffer.pending = None
+    _flush_appends(pending)
+
+
+def append_records(sheet_name: str, cols: list[str], recs: list[dict]) -> int:
+    rows = [[str(rec.get(c, "")) for c in cols] for rec in recs]
+    if not rows:
+        return 0
+
+    pending = getattr(_write_buffer, "pending", None)
+    if pending is not None:
+        entry = pending.setdefault(sheet_name, {"cols": cols, "rows": []})
+        entry["rows"].extend(rows)
+        return len(rows)
+
+    _flush_appends({sheet_name: {"cols": cols, "rows": rows}})
+    return len(rows)
+
+
+def append_record(sheet_name: str, cols: list[str], rec: dict):
+    append_records(sheet_name, cols, [rec])
+
+
+def _contiguous_runs(nums) -> list[tuple[int, int]]:
+    """[2, 3, 4, 7, 9, 10] -> [(2, 4), (7, 7), (9, 10)]  (inclusive)"""
+    ranges = []
+    for r in sorted(set(nums)):
+        if ranges and r == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], r)
+        else:
+            ranges.append((r, r))
+    return ranges
+
+
+def _meta_for_write(sheet_name: str):
+    cell = SHEET_META_CELLS.get(sheet_name)
+    return (cell, _new_meta_token()) if cell else None
+
+
+def _delete_sheet_rows(ws, rows, meta=None) -> int:
+    """
+    حذف برشا أسطر في request واحد (spreadsheet.batchUpdate):
+    الأسطر المتلاصقة تولّي range وحدة، والـ ranges تتبعث من لوطا للفوق
+    باش الـ indexes ما يتزحزحوش بين request و request.
+    meta: (cell, value) لخلية last_modified، تتكتب في نفس الـ request.
+    """
+    ranges = _contiguous_runs(rows)
+    if not ranges:
+        return 0
+
+    delete_reqs = [
+        {
+            "deleteDimension": {
+                "range": {
+                    "sheetId": ws.id,
+                    "dimension": "ROWS",
+                    "startIndex": start - 1,
+                    "endIndex": end,
+                }
+            }
+        }
+        for start, end in reversed(ranges)
+    ]
+    if meta is not None:
+        m_row, m_col = a1_to_rowcol(meta[0])
+        delete_reqs.append({
+            "updateCells": {
+                "range": {
+                    "sheetId": ws.id,
+                    "startRowIndex": m_row - 1,
+                    "endRowIndex": m_row,
+                    "startColumnIndex": m_col - 1,
+                    "endColumnIndex": m_col,
+                },
+                "rows": [{"values": [{"userEnteredValue": {"stringValue": meta[1]}}]}],
+                "fields": "userEnteredValue",
+            }
+        })
+    safe_batch_update(get_spreadsheet(), {"requests": delete_reqs})
+    return sum(end - start + 1 for start, end in ranges)
+
+
+def delete_records_by_ids(sheet_name: str, cols: list[str], rec_ids) -> int:
+    ids = {str(x) for x in rec_ids if str(x)}
+    if not ids:
+        return 0
+
+    ws = ensure_ws(sheet_name, cols)
+    found = _resolve_rows(ws, cols, "id", ids)
+    rows_to_delete = sorted(found)
+    meta = _meta_for_write(sheet_name)
+    n = _delete_sheet_rows(ws, rows_to_delete, meta=meta)
+    if n:
+        _row_index_deleted(ws, rows_to_delete)
+        invalidate_sheet(sheet_name, deleted=("id", set(found.values())), meta=meta and meta[1])
+    return n
+
+
+def delete_record_by_id(sheet_name: str, cols: list[str], rec_id: str):
+    delete_records_by_ids(sheet_name, cols, [rec_id])
+
+
+def update_records_fields_by_id(sheet_name: str, cols: list[str], updates_by_id) -> int:
+    """
+    updates_by_id: {rec_id: {field: value}} ولا list of (rec_id, updates).
+    الكل يتكتب في values.batchUpdate واحد: لكل سطر، الأعمدة المتلاصقة تولّي range وحدة.
+    """
+    items = list(updates_by_id.items()) if isinstance(updates_by_id, dict) else list(updates_by_id)
+    if not items:
+        return 0
+
+    ws = ensure_ws(sheet_name, cols)
+    found = _resolve_rows(ws, cols, "id", {str(rec_id) for rec_id, _ in items})
+    row_of = {rid: row for row, rid in found.items()}
+
+    data = []
+    written = []
+    for rec_id, updates in items:
+        row_idx = row_of.get(str(rec_id))
+        if not row_idx:
+            continue
+        cells = {cols.index(f) + 1: str(v) for f, v in updates.items() if f in cols}
+        if not cells:
+            continue
+        for c_start, c_end in _contiguous_runs(cells):
+            data.append({
+                "range": f"{rowcol_to_a1(row_idx, c_start)}:{rowcol_to_a1(row_idx, c_end)}",
+                "values": [[cells[c] for c in range(c_start, c_end + 1)]],
+            })
+        written.append((rec_id, updates))
+
+    if data:
+        meta = _meta_for_write(sheet_name)
+        if meta is not None:
+            data.append({"range": meta[0], "values": [[meta[1]]]})
+        safe_batch_update_values(ws, data)
+        if any(("id" in u) or ("branche" in u) for _, u in items):
+            _row_index_forget(ws)
+        # USER_ENTERED ينجم يبدّل شكل القيمة -> هنا نعاودو نجيبو الشيت (بلا write-through)
+        invalidate_sheet(sheet_name, updated=written)
+    return len(written)
+
+
+def update_record_fields_by_id(sheet_name: str, cols: list[str], rec_id: str, updates: dict):
+    update_records_fields_by_id(sheet_name, cols, {rec_id: updates})
+
+
+def delete_records_by_branch(sheet_name: str, cols: list[str], branch_value: str) -> int:
+    if "branche" not in cols:
+        return 0
+
+    ws = ensure_ws(sheet_name, cols)
+    rows_to_delete = sorted(_resolve_rows(ws, cols, "branche", {branch_value}))
+    meta = _meta_for_write(sheet_name)
+    n = _delete_sheet_rows(ws, rows_to_delete, meta=meta)
+    if n:
+        _row_index_deleted(ws, rows_to_delete)
+        invalidate_sheet(sheet_name, deleted=("branche", {branch_value}), meta=meta and meta[1])
+    return n
+
+
+def notification_log_rec(
+    trainee_id: str,
+    phone: str,
+    target: str,
+    branche: str,
+    period_from: date,
+    period_to: date,
+    period_label: str,
+) -> dict:
+    return {
+        "id": uuid.uuid4().hex[:12],
+        "trainee_id": trainee_id,
+        "phone": phone,
+        "target": target,
+        "branche": branche,
+        "period_from": period_from.strftime("%Y-%m-%d"),
+        "period_to": period_to.strftime("%Y-%m-%d"),
+        "period_label": period_label,
+        "sent_at_iso": datetime.utcnow().isoformat(),
+    }
+
+
+def append_notification_log(
+    trainee_id: str,
+    phone: str,
+    target: str,
+    branche: str,
+    period_from: date,
+    period_to: date,
+    period_label: str,
+):
+    rec = notification_log_rec(trainee_id, phone, target, branche, period_from, period_to, period_label)
+    append_record(NOTIF_LOG_SHEET, NOTIF_LOG_COLS, rec)
+
+
+def append_notification_logs(recs: list[dict]) -> int:
+    return append_records(NOTIF_LOG_SHEET, NOTIF_LOG_COLS, recs)
+
+
+# ================== Load data ==================
+def _fetch_sheet_df(sheet_name: str, cols: list[str]):
+    ws = ensure_ws(sheet_name, cols, verify_header=False)
+    return _frame_from_values(ws, sheet_name, cols, safe_get_all_values(ws))
+
+
+def _frame_from_values(ws, sheet_name: str, cols: list[str], vals: list[list[str]]):
+    # vals = الشيت الكل (كيف get_all_values) -> (typed df, sync)
+    vals = check_header_from_values(ws, cols, vals)
+    remember_row_index(ws, vals)
+
+    sync = None
+    meta_cell = SHEET_META_CELLS.get(sheet_name)
+    if meta_cell:
+        # الخلية برّا الـ schema: ما تدخلش في الـ DataFrame
+        m_col = a1_to_rowcol(meta_cell)[1]
+        meta = vals[0][m_col - 1] if len(vals[0]) >= m_col else ""
+        vals = [(list(r) + [""] * len(cols))[: len(cols)] for r in vals]
+        sync = {"n_rows": len(vals), "tail_sum": _row_checksum(vals[-1]), "meta": meta, "full_at": _now_ts()}
+
+    if not vals or len(vals) < 2:
+        return typed_frame(pd.DataFrame(columns=cols, dtype=str)), sync
+    return typed_frame(pd.DataFrame(vals[1:], columns=vals[0])), sync
+
+
+def _fetch_sheet_incremental(sheet_name: str, cols: list[str], stale: dict):
+    """
+    refresh خفيف: call واحدة تجيب خلية last_modified + الأسطر من آخر سطر معروف (n) للآخر.
+    يرجّع None (-> full reload) كان: الخلية تبدّلت، السطر n تبدّل ولا تفسخ، ولا فات FULL_RESYNC_SEC.
+    """
+    sync = stale.get("sync")
+    meta_cell = SHEET_META_CELLS.get(sheet_name)
+    if not sync or not meta_cell or (_now_ts() - sync["full_at"]) >= FULL_RESYNC_SEC:
+        return None
+
+    df_old = stale["df"]
+    n = sync["n_rows"]
+    if len(df_old) != n - 1:
+        return None
+
+    ws = ensure_ws(sheet_name, cols, verify_header=False)
+    last_col = _col_letter(cols, cols[-1])
+    res = safe_batch_get(ws, [meta_cell, f"A{n}:{last_col}"])
+    meta = res[0][0][0] if res[0] and res[0][0] else ""
+    rows = [(list(r) + [""] * len(cols))[: len(cols)] for r in res[1]]
+
+    if meta != sync["meta"] or not rows or _row_checksum(rows[0]) != sync["tail_sum"]:
+        return None
+
+    new_rows = rows[1:]
+    if not new_rows:
+        return df_old, {**sync}
+
+    df_new = typed_frame(pd.DataFrame(new_rows, columns=cols).reindex(columns=df_old.columns, fill_value=""))
+    _row_index_appended(ws, cols, n + 1, new_rows)
+    return (
+        _concat_typed(df_old, df_new),
+        {**sync, "n_rows": n + len(new_rows), "tail_sum": _row_checksum(new_rows[-1])},
+    )
+
+
+def _load_sheet_shared(sheet_name: str, cols: list[str]) -> pd.DataFrame:
+    """
+    snapshot مشترك لكل الـ process مع TTL (DATA_TTL_SEC) + invalidation من write helpers.
+    single-flight: كان برشا sessions طلبو نفس الشيت في نفس الوقت، واحد برك يعمل الـ fetch.
+    يرجّع الـ DataFrame المشترك نفسو (ما تبدّلوش) ويخلّي الأخطاء تطلع.
+    """
+    df = _cached_frame(sheet_name, sheet_version(sheet_name))
+    metrics_cache(sheet_name, df is not None)
+    if df is None:
+        from .analytics import _exceed_absences_fetched
+
+        with _sheet_fetch_lock(sheet_name):
+            v = sheet_version(sheet_name)
+            df = _cached_frame(sheet_name, v)
+            if df is None:
+                stale = _stale_frame(sheet_name, v)
+                fetched = _fetch_sheet_incremental(sheet_name, cols, stale) if stale else None
+                df, sync = fetched or _fetch_sheet_df(sheet_name, cols)
+                _remember_frame(sheet_name, v, df, sync)
+                if fetched and sheet_name == ABSENCES_SHEET and len(df) > len(stale["df"]):
+                    _exceed_absences_fetched(stale, df)
+    return df
+
+
+@timed_call
+def prefetch_sheets(sheets) -> int:
+    """
+    cold start: الشيتات اللي ما عندهمش snapshot أصلًا يتجابو الكل في values.batchGet واحد
+    (round-trip واحد بدل header + get_all_values لكل شيت). sheets = [(sheet_name, cols)].
+    الشيتات اللي عندهم snapshot (حتى قديم) يقعدو للـ load العادي (incremental / full).
+    يرجّع عدد الشيتات اللي تجابو.
+    """
+    todo = [(name, cols) for name, cols in sheets if _frame_stamp(name) is None]
+    if len(todo) < 2:
+        return 0
+
+    # single-flight: الشيت اللي session أخرى تجيب فيه توّا نخلّوه (الـ load يستنى الـ lock متاعو)
+    held, batch = [], []
+    try:
+        for name, cols in sorted(todo):
+            lock = _sheet_fetch_lock(name)
+            if not lock.acquire(blocking=False):
+                continue
+            held.append(lock)
+            if _frame_stamp(name) is None:
+                batch.append((name, cols))
+        if len(batch) < 2:
+            return 0
+
+        ws_map = get_ws_map(get_spreadsheet())
+        batch = [(name, cols) for name, cols in batch if name in ws_map]
+        versions = {name: sheet_version(name) for name, _ in batch}
+        resp = safe_values_batch_get(get_spreadsheet(), [f"'{name}'" for name, _ in batch])
+
+        for (name, cols), vr in zip(batch, resp.get("valueRanges", [])):
+            df, sync = _frame_from_values(ws_map[name], name, cols, fill_gaps(vr.get("values", [])))
+            _remember_frame(name, versions[name], df, sync)
+        return len(batch)
+    finally:
+        for lock in held:
+            lock.release()
+
+
+def _load_sheet(sheet_name: str, cols: list[str]) -> pd.DataFrame:
+    try:
+        return _load_sheet_shared(sheet_name, cols).copy()
+    except Exception as e:
+        from .mirror import mirror_read
+
+        df_local = mirror_read(sheet_name)
+        if df_local is not None:
+            notify("warning", f"⚠️ Google Sheets ما جاوبش ('{sheet_name}') — البيانات من النسخة المحلية.")
+            return df_local
+        if isinstance(e, gse.APIError):
+            notify("error", f"❌ APIError في load ('{sheet_name}'):\n" + _apierr_details(e))
+            return typed_frame(pd.DataFrame(columns=cols, dtype=str))  # نفس الـ dtypes متاع الـ path العادي
+        raise
+
+
+@timed_call
+def load_trainees():
+    return _load_sheet(TRAINEES_SHEET, TRAINEES_COLS)
+
+
+@timed_call
+def load_subjects():
+    return _load_sheet(SUBJECTS_SHEET, SUBJECTS_COLS)
+
+
+@timed_call
+def load_absences():
+    return _load_sheet(ABSENCES_SHEET, ABSENCES_COLS)
+
+
+@timed_call
+def load_notifications():
+    return _load_sheet(NOTIF_LOG_SHEET, NOTIF_LOG_COLS)
+
+
+def _load_sheet_stamped(sheet_name: str, cols: list[str]):
+    # (df المشترك، stamp متاعو) — stamp None كان الـ snapshot تبدّل بين الـ load والقراءة
+    df = _load_sheet_shared(sheet_name, cols)
+    store = _sheet_cache_store()
+    with store["lock"]:
+        cur = store["frames"].get(sheet_name)
+    if cur is None or cur["df"] is not df:
+        return df, None
+    return df, (cur["version"], cur["at"])
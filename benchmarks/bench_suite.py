@@ -0,0 +1,129 @@
+"""
+Benchmark suite على datasets اصطناعية (1k / 10k / 100k غياب) و fake Sheets backend:
+WhatsApp (متكوّن واحد + الفرع الكل)، جدول 10٪ (Tab4)، update_record_fields_by_id،
+delete_records_by_branch و import.
+
+    python benchmarks/bench_suite.py --sizes 1000,10000,100000
+    python benchmarks/bench_suite.py --sizes 10000 --latency-ms 80 --p429 0.02 --json out.json
+"""
+
+import argparse
+import io
+import json
+import random
+import time
+from datetime import timedelta
+
+from bench_writes import BRANCH, api_calls, gsheets, importer, pct, schema, storage
+from attendancehub import analytics, runtime
+from fake_gspread import FakeClient, FakeSpreadsheet
+from synthetic import BRANCHES, YEAR_DAYS, YEAR_START, seed_spreadsheet, sized
+
+assert BRANCH == BRANCHES[0]
+
+
+def connect_fresh(args, n_absences: int) -> FakeSpreadsheet:
+    runtime.reset_stores()  # كل الـ stores (snapshots, row index, 10٪, API guard) من الصفر
+    gsheets.SHEETS_QUOTA_PER_MIN = args.quota or 10 ** 9
+    sh = FakeSpreadsheet(latency_ms=args.latency_ms, p429=args.p429, retry_after=args.retry_after, seed=args.seed)
+    seed_spreadsheet(sh, sized(schema, n_absences, seed=args.seed))
+    gsheets.connect(FakeClient(sh), sh.id)
+    return sh
+
+
+def measure(results: list, size: int, name: str, ops: list, unit: str = "op"):
+    samples = []
+    c0 = api_calls()
+    for op in ops:
+        t0 = time.perf_counter()
+        op()
+        samples.append(time.perf_counter() - t0)
+    n = len(ops)
+    row = {
+        "size": size, "path": name, "n": n, "unit": unit,
+        "per_sec": round(n / sum(samples), 2) if sum(samples) else 0.0,
+        "calls_per_op": round((api_calls() - c0) / n, 3) if n else 0.0,
+        "p50_ms": round(pct(samples, 50), 2), "p95_ms": round(pct(samples, 95), 2),
+    }
+    results.append(row)
+    print(f"{name:<30} {n:>6} {row['per_sec']:>10.1f} {row['calls_per_op']:>9.3f} {row['p50_ms']:>10.2f} {row['p95_ms']:>10.2f}")
+
+
+def import_file(n_rows: int, trainee_ids: list, subject_ids: list, rnd: random.Random) -> io.BytesIO:
+    lines = ["trainee_id,subject_id,date,heures_absence,justifie,commentaire"]
+    for _ in range(n_rows):
+        d = YEAR_START + timedelta(days=rnd.randrange(YEAR_DAYS))
+        lines.append(f"{rnd.choice(trainee_ids)},{rnd.choice(subject_ids)},{d.isoformat()},{rnd.choice(['1', '2'])},Non,")
+    f = io.BytesIO("\n".join(lines).encode("utf-8"))
+    f.name = "bench.csv"
+    return f
+
+
+def run_size(args, size: int, results: list):
+    rnd = random.Random(args.seed)
+    sh = connect_fresh(args, size)
+    n_abs = len(sh.wss[schema.ABSENCES_SHEET].rows) - 1
+    print(f"\n== {size} ({n_abs} غياب، {len(sh.wss[schema.TRAINEES_SHEET].rows) - 1} متكوّن)")
+    print(f"{'path':<30} {'n':>6} {'per sec':>10} {'calls/op':>9} {'p50 ms':>10} {'p95 ms':>10}")
+
+    sheets = [(schema.TRAINEES_SHEET, schema.TRAINEES_COLS), (schema.SUBJECTS_SHEET, schema.SUBJECTS_COLS),
+              (schema.ABSENCES_SHEET, schema.ABSENCES_COLS), (schema.NOTIF_LOG_SHEET, schema.NOTIF_LOG_COLS)]
+    measure(results, size, "cold load (prefetch + load_*)", [lambda: (storage.prefetch_sheets(sheets), [storage._load_sheet(n, c) for n, c in sheets])])
+
+    df_tr_all, df_sub_all = storage.load_trainees(), storage.load_subjects()
+    df_tr_b = df_tr_all[df_tr_all["branche"] == BRANCH]
+    df_sub_b = df_sub_all[df_sub_all["branche"] == BRANCH]
+    df_abs_b = analytics.enriched_absences(BRANCH)
+    d_from, d_to = YEAR_START, YEAR_START + timedelta(days=YEAR_DAYS)
+
+    picks = [df_tr_b.iloc[i] for i in rnd.sample(range(len(df_tr_b)), min(args.ops, len(df_tr_b)))]
+    measure(results, size, "whatsapp (متكوّن واحد)", [
+        lambda r=r: analytics.build_whatsapp_message_for_trainee(r, df_abs_b, df_sub_all, BRANCH, d_from, d_to, "bench") for r in picks
+    ])
+    measure(results, size, "whatsapp (الفرع الكل)", [
+        lambda: analytics.build_whatsapp_messages_for_trainees(df_tr_b, df_abs_b, df_sub_all, BRANCH, d_from, d_to, "bench")
+    ] * args.repeat, unit="branch")
+
+    measure(results, size, "10% table (cold)", [lambda: analytics.exceedance_table(BRANCH, df_tr_b, df_sub_b, df_abs_b)])
+    measure(results, size, "10% table (warm)", [lambda: analytics.exceedance_table(BRANCH, df_tr_b, df_sub_b, df_abs_b)] * args.repeat)
+
+    ids = [f"a{i}" for i in rnd.sample(range(n_abs), min(args.ops, n_abs))]
+    measure(results, size, "update_record_fields_by_id", [
+        lambda a=a: storage.update_record_fields_by_id(schema.ABSENCES_SHEET, schema.ABSENCES_COLS, a, {"commentaire": "bench"}) for a in ids
+    ])
+
+    f = import_file(size, df_tr_b["id"].tolist(), df_sub_b["id"].tolist(), rnd)
+    measure(results, size, "import (CSV)", [lambda: importer.import_absences(importer.read_import_chunks(f), BRANCH)], unit="file")
+    results[-1]["rows_per_sec"] = round(size / (results[-1]["p50_ms"] / 1000), 1) if results[-1]["p50_ms"] else 0.0
+    print(f"{'':<30} {size:>6} rows -> {results[-1]['rows_per_sec']:.0f} rows/s")
+
+    measure(results, size, "delete_records_by_branch", [
+        lambda: storage.delete_records_by_branch(schema.TRAINEES_SHEET, schema.TRAINEES_COLS, BRANCHES[1])
+    ], unit="branch")
+    print("fake API calls:", dict(sh.calls))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,10000,100000", help="عدد الغيابات في كل dataset")
+    ap.add_argument("--ops", type=int, default=50, help="عمليات لكل مسار (متكوّن واحد / update)")
+    ap.add_argument("--repeat", type=int, default=3, help="تكرار المسارات الثقيلة (الفرع الكل / 10٪ warm)")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="round-trip مصطنع لكل طلب")
+    ap.add_argument("--p429", type=float, default=0.0, help="احتمال 429 لكل طلب")
+    ap.add_argument("--retry-after", type=float, default=None, help="Retry-After (s) مع الـ 429")
+    ap.add_argument("--quota", type=int, default=0, help="SHEETS_QUOTA_PER_MIN (0 = بلا حد)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", default="", help="يكتب النتائج في ملف JSON (للمقارنة بين commits)")
+    args = ap.parse_args()
+
+    results = []
+    for size in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        run_size(args, size, results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
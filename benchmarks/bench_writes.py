@@ -0,0 +1,136 @@
+"""
+Benchmark: import + مسارات الكتابة (append_record / update_record_fields_by_id / delete_record_by_id)
+على fake gspread في الذاكرة. يقيس rows/s، عدد الـ API calls لكل سطر/عملية و p50/p95.
+
+    python benchmarks/bench_writes.py --rows 5000 --ops 200
+"""
+
+import argparse
+import io
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+warnings.filterwarnings("ignore")
+logging.disable(logging.WARNING)  # notify() متاع الـ core يمشي للـ logging
+
+from attendancehub import gsheets, importer, schema, storage  # noqa: E402
+from fake_gspread import FakeClient, FakeSpreadsheet  # noqa: E402
+
+BRANCH = "Menzel Bourguiba"
+
+
+def seed(n_trainees: int, n_subjects: int, n_absences: int, rnd: random.Random) -> FakeSpreadsheet:
+    sh = FakeSpreadsheet()
+    sh.add_sheet(schema.TRAINEES_SHEET, [schema.TRAINEES_COLS] + [
+        [f"t{i}", f"Nom {i}", "22123456", "98123456", BRANCH, "Info", "2025-09-01", "1"] for i in range(n_trainees)
+    ])
+    sh.add_sheet(schema.SUBJECTS_SHEET, [schema.SUBJECTS_COLS] + [
+        [f"s{i}", f"Mat {i}", BRANCH, "Info", "60", "4"] for i in range(n_subjects)
+    ])
+    sh.add_sheet(schema.ABSENCES_SHEET, [schema.ABSENCES_COLS] + [
+        [f"a{i}", f"t{rnd.randrange(n_trainees)}", f"s{rnd.randrange(n_subjects)}",
+         f"2025-{rnd.randint(9, 12):02d}-{rnd.randint(1, 28):02d}", "2", "Non", ""]
+        for i in range(n_absences)
+    ])
+    sh.add_sheet(schema.NOTIF_LOG_SHEET, [schema.NOTIF_LOG_COLS])
+    return sh
+
+
+def import_csv(n_rows: int, n_trainees: int, n_subjects: int, rnd: random.Random) -> io.BytesIO:
+    lines = ["trainee_id,subject_id,date,heures_absence,justifie,commentaire"]
+    for _ in range(n_rows):
+        lines.append(
+            f"t{rnd.randrange(n_trainees)},s{rnd.randrange(n_subjects)},"
+            f"2026-{rnd.randint(1, 6):02d}-{rnd.randint(1, 28):02d},{rnd.choice(['1', '1.5', '2'])},Non,"
+        )
+    f = io.BytesIO("\n".join(lines).encode("utf-8"))
+    f.name = "bench.csv"
+    return f
+
+
+def api_calls() -> int:
+    return sum(s["calls"] for s in gsheets.api_stats().values())
+
+
+def pct(samples: list, q: float) -> float:
+    return float(np.percentile(samples, q)) * 1000 if samples else 0.0
+
+
+def report(name: str, n: int, seconds: float, calls: int, samples: list, unit: str = "op"):
+    print(
+        f"{name:<28} {n:>7} {n / seconds if seconds else 0:>10.1f} {calls / n if n else 0:>10.3f}"
+        f" {pct(samples, 50):>9.2f} {pct(samples, 95):>9.2f}   ({unit})"
+    )
+
+
+def bench_import(args, rnd):
+    f = import_csv(args.rows, args.trainees, args.subjects, rnd)
+    total = importer.count_import_rows(f)
+    marks = [(0, time.perf_counter())]
+    c0 = api_calls()
+
+    res = importer.import_absences(importer.read_import_chunks(f), BRANCH, progress=lambda done, _: marks.append((done, time.perf_counter())))
+    if res["error"]:
+        raise SystemExit(f"import failed after {res['imported']} rows: {res['error']}")
+
+    seconds = marks[-1][1] - marks[0][1]
+    # latency لكل سطر في كل دفعة (بين progress و اللي بعدو)
+    per_row = [(t1 - t0) / (d1 - d0) for (d0, t0), (d1, t1) in zip(marks, marks[1:]) if d1 > d0]
+    report(f"import ({res['imported']}/{total} ok)", res["read"], seconds, api_calls() - c0, per_row, "row")
+
+
+def bench_op(name: str, ops: list):
+    samples = []
+    c0 = api_calls()
+    for op in ops:
+        t0 = time.perf_counter()
+        op()
+        samples.append(time.perf_counter() - t0)
+    report(name, len(ops), sum(samples), api_calls() - c0, samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=5000, help="أسطر ملف الـ import")
+    ap.add_argument("--ops", type=int, default=200, help="عدد العمليات لكل مسار كتابة")
+    ap.add_argument("--existing", type=int, default=5000, help="غيابات موجودة في الشيت قبل البداية")
+    ap.add_argument("--trainees", type=int, default=300)
+    ap.add_argument("--subjects", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    sh = seed(args.trainees, args.subjects, args.existing, rnd)
+    gsheets.SHEETS_QUOTA_PER_MIN = 10 ** 9  # الـ fake ما عندوش quota: نقيسو الكود مش الـ token bucket
+    gsheets.connect(FakeClient(sh), sh.id)
+    storage.load_absences()  # snapshot + row index سخونين كيف في التطبيق
+
+    print(f"{'path':<28} {'n':>7} {'per sec':>10} {'calls/n':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    bench_import(args, rnd)
+
+    ids = [f"a{i}" for i in rnd.sample(range(args.existing), min(2 * args.ops, args.existing))]
+    upd, dele = ids[: len(ids) // 2], ids[len(ids) // 2:]
+
+    def rec():
+        return {"id": uuid.uuid4().hex[:10], "trainee_id": f"t{rnd.randrange(args.trainees)}",
+                "subject_id": f"s{rnd.randrange(args.subjects)}", "date": "2026-07-01", "heures_absence": "1",
+                "justifie": "Non", "commentaire": ""}
+
+    bench_op("append_record", [lambda: storage.append_record(schema.ABSENCES_SHEET, schema.ABSENCES_COLS, rec()) for _ in range(args.ops)])
+    bench_op("update_record_fields_by_id", [
+        lambda a=a: storage.update_record_fields_by_id(schema.ABSENCES_SHEET, schema.ABSENCES_COLS, a, {"commentaire": "bench"}) for a in upd
+    ])
+    bench_op("delete_record_by_id", [lambda a=a: storage.delete_record_by_id(schema.ABSENCES_SHEET, schema.ABSENCES_COLS, a) for a in dele])
+    print("fake API calls:", dict(sh.calls))
+
+
+if __name__ == "__main__":
+    main()
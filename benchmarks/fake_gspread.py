@@ -0,0 +1,189 @@
+# fake gspread في الذاكرة للـ benchmarks: نفس الـ methods اللي يستعملهم AttendanceHub برك
+# (ws.get_all_values / batch_get / append_rows / ...، sh.values_batch_get / batch_update)
+# وكل طلب يتحسب في sh.calls باش نقارنو عدد الـ API calls.
+# latency_ms / p429: نحاكيو الشبكة والـ quota (429 + Retry-After) كيف Google Sheets.
+
+import collections
+import json
+import random
+import time
+
+import gspread.exceptions as gse
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol
+
+
+class FakeResponse:
+    """القدر اللي يلزم لـ gse.APIError و _status_code / _retry_after_sec."""
+
+    def __init__(self, status_code: int, retry_after=None, message: str = "Quota exceeded (fake)",
+                 status: str = "RESOURCE_EXHAUSTED"):
+        self.status_code = status_code
+        self.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self.message, self.status = message, status
+        self.text = json.dumps(self.json())
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.message, "status": self.status}}
+
+
+def _trim(rows: list) -> list:
+    out = [list(r) for r in rows]
+    for r in out:
+        while r and r[-1] == "":
+            r.pop()
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+class FakeWorksheet:
+    def __init__(self, sh, title: str, ws_id: int, rows=None, cols=None):
+        self.spreadsheet = sh
+        self.title = title
+        self.id = ws_id
+        self.rows = [[str(v) for v in r] for r in (rows or [])]
+        # عدد أعمدة الـ grid: الكتابة برّاه تفشل كيف Google ("exceeds grid limits")
+        self.col_count = int(cols) if cols else max([len(r) for r in self.rows] + [8])
+
+    def _call(self, op: str):
+        self.spreadsheet.call(op)
+
+    def _range(self, rng: str) -> list:
+        g = a1_range_to_grid_range(rng)
+        r0, r1 = g.get("startRowIndex", 0), g.get("endRowIndex", len(self.rows))
+        c0, c1 = g.get("startColumnIndex", 0), g.get("endColumnIndex", None)
+        return _trim([r[c0:c1] for r in self.rows[r0:r1]])
+
+    def _write(self, row: int, col: int, values: list):
+        width = col - 1 + max((len(v) for v in values), default=0)
+        if width > self.col_count:
+            raise gse.APIError(FakeResponse(
+                400, message=f"Range ({self.title}!R{row}C{width}) exceeds grid limits. Max columns: {self.col_count}",
+                status="INVALID_ARGUMENT",
+            ))
+        for i, vals in enumerate(values):
+            while len(self.rows) < row + i:
+                self.rows.append([])
+            tgt = self.rows[row + i - 1]
+            for j, v in enumerate(vals):
+                while len(tgt) < col + j:
+                    tgt.append("")
+                tgt[col + j - 1] = str(v)
+
+    def row_values(self, row: int):
+        self._call("row_values")
+        return _trim([self.rows[row - 1]])[0] if len(self.rows) >= row and any(self.rows[row - 1]) else []
+
+    def get_all_values(self, *args, **kwargs):
+        self._call("get_all_values")
+        width = max((len(r) for r in self.rows), default=0)
+        return [r + [""] * (width - len(r)) for r in _trim(self.rows)]
+
+    def batch_get(self, ranges, *args, **kwargs):
+        self._call("batch_get")
+        return [self._range(r) for r in ranges]
+
+    def update(self, rng, values=None, *args, **kwargs):
+        self._call("update")
+        if isinstance(rng, list):  # gspread 6: update(values, range_name)
+            rng, values = values, rng
+        start = "A1" if rng == "1:1" else rng.split(":")[0]
+        self._write(*a1_to_rowcol(start), values)
+
+    def update_cell(self, row: int, col: int, value):
+        self._call("update_cell")
+        self._write(row, col, [[value]])
+
+    def batch_update(self, data, *args, **kwargs):
+        self._call("batch_update")
+        for d in data:
+            self._write(*a1_to_rowcol(d["range"].split("!")[-1].split(":")[0]), d["values"])
+
+    def _append(self, rows: list) -> dict:
+        while self.rows and not any(self.rows[-1]):  # append يكتب بعد آخر سطر فيه بيانات
+            self.rows.pop()
+        first = len(self.rows) + 1
+        self.rows.extend([str(v) for v in r] for r in rows)
+        return {"updates": {"updatedRange": f"'{self.title}'!A{first}:Z{len(self.rows)}"}}
+
+    def append_row(self, row, *args, **kwargs):
+        self._call("append_row")
+        return self._append([row])
+
+    def append_rows(self, rows, *args, **kwargs):
+        self._call("append_rows")
+        return self._append(rows)
+
+    def delete_rows(self, start: int, end: int = None):
+        self._call("delete_rows")
+        del self.rows[start - 1:(end or start)]
+
+
+class FakeSpreadsheet:
+    def __init__(self, sheet_id: str = "BENCH", latency_ms: float = 0.0, jitter: float = 0.2,
+                 p429: float = 0.0, retry_after=None, seed: int = 0):
+        self.id = sheet_id
+        self.calls = collections.Counter()
+        self.wss = {}
+        self.latency_ms = latency_ms    # round-trip متاع كل طلب (± jitter)
+        self.jitter = jitter
+        self.p429 = p429                # احتمال 429 لكل طلب
+        self.retry_after = retry_after  # header Retry-After (ثواني) مع الـ 429
+        self.rnd = random.Random(seed)
+
+    def call(self, op: str):
+        self.calls[op] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000 * self.rnd.uniform(1 - self.jitter, 1 + self.jitter))
+        if self.p429 and self.rnd.random() < self.p429:
+            self.calls["429"] += 1
+            raise gse.APIError(FakeResponse(429, self.retry_after))
+
+    def add_sheet(self, title: str, rows: list, cols=None) -> FakeWorksheet:
+        """للـ seed برك (ما يتحسبش call)."""
+        ws = FakeWorksheet(self, title, len(self.wss) + 1, rows, cols)
+        self.wss[title] = ws
+        return ws
+
+    def worksheets(self, *args, **kwargs):
+        self.call("worksheets")
+        return list(self.wss.values())
+
+    def add_worksheet(self, title: str, rows=None, cols=None, *args, **kwargs):
+        self.call("add_worksheet")
+        return self.add_sheet(title, [], cols)
+
+    def _by_id(self, ws_id: int) -> FakeWorksheet:
+        return next(w for w in self.wss.values() if w.id == ws_id)
+
+    def batch_update(self, body: dict):
+        self.call("batch_update")
+        for req in body.get("requests", []):
+            if "deleteDimension" in req:
+                rng = req["deleteDimension"]["range"]
+                del self._by_id(rng["sheetId"]).rows[rng["startIndex"]:rng["endIndex"]]
+            elif "updateCells" in req:
+                uc = req["updateCells"]
+                g = uc["range"]
+                vals = [[next(iter(c.get("userEnteredValue", {"": ""}).values())) for c in row.get("values", [])] for row in uc["rows"]]
+                self._by_id(g["sheetId"])._write(g["startRowIndex"] + 1, g["startColumnIndex"] + 1, vals)
+        return {}
+
+    def values_batch_get(self, ranges, params=None):
+        self.call("values_batch_get")
+        out = []
+        for r in ranges:
+            title, _, rng = r.partition("!")
+            ws = self.wss[title.strip("'")]
+            values = ws._range(rng) if rng else _trim(ws.rows)
+            out.append({"range": r, "values": values} if values else {"range": r})
+        return {"valueRanges": out}
+
+
+class FakeClient:
+    def __init__(self, sh: FakeSpreadsheet):
+        self.sh = sh
+
+    def open_by_key(self, key: str):
+        self.sh.call("open_by_key")
+        return self.sh
@@ -0,0 +1,67 @@
+"""
+Dataset اصطناعي بنفس أعمدة TRAINEES_COLS / SUBJECTS_COLS / ABSENCES_COLS (سنة تكوين كاملة)
+للـ benchmarks: عدد الفروع، المتكوّنين، المواد والغيابات لكل متكوّن قابلين للضبط.
+"""
+
+import random
+from datetime import date, timedelta
+
+BRANCHES = ("Menzel Bourguiba", "Bizerte")
+SPECIALITES = ("Informatique", "Electricité", "Comptabilité", "Mécanique", "Esthétique")
+YEAR_START = date(2025, 9, 15)
+YEAR_DAYS = 270  # سبتمبر -> جوان
+
+
+def generate(schema, branches=BRANCHES, trainees_per_branch: int = 100, subjects_per_branch: int = 12,
+             absences_per_trainee: float = 10.0, seed: int = 1) -> dict:
+    """-> {sheet_name: rows (header + أسطر strings)} بأسماء الشيتات متاع attendancehub.schema."""
+    rnd = random.Random(seed)
+    trainees, subjects, absences = [], [], []
+
+    for b_i, branch in enumerate(branches):
+        specs = SPECIALITES[: max(2, len(SPECIALITES) - b_i)]
+        subs_by_spec = {s: [] for s in specs}
+        for s_i in range(subjects_per_branch):
+            sid = f"s{b_i}_{s_i}"
+            own = rnd.sample(specs, rnd.randint(1, 2))
+            for s in own:
+                subs_by_spec[s].append(sid)
+            total = rnd.choice([30, 45, 60, 90, 120])
+            subjects.append([sid, f"Matière {b_i}.{s_i}", branch, ",".join(own), str(total), str(rnd.choice([2, 3, 4]))])
+
+        for t_i in range(trainees_per_branch):
+            tid = f"t{b_i}_{t_i}"
+            spec = rnd.choice(specs)
+            trainees.append([
+                tid, f"Stagiaire {b_i}.{t_i}", f"2{rnd.randint(1000000, 9999999)}", f"9{rnd.randint(1000000, 9999999)}",
+                branch, spec, YEAR_START.isoformat(), "1",
+            ])
+            own_subs = subs_by_spec[spec] or [subjects[-1][0]]
+            # Poisson تقريبي: شكون ما يغيبش، وشكون يغيب برشا
+            n_abs = max(0, int(rnd.expovariate(1 / absences_per_trainee))) if absences_per_trainee else 0
+            for _ in range(n_abs):
+                d = YEAR_START + timedelta(days=rnd.randrange(YEAR_DAYS))
+                absences.append([
+                    f"a{len(absences)}", tid, rnd.choice(own_subs), d.isoformat(),
+                    rnd.choice(["1", "1.5", "2", "3", "4"]), "Oui" if rnd.random() < 0.25 else "Non", "",
+                ])
+
+    return {
+        schema.TRAINEES_SHEET: [list(schema.TRAINEES_COLS)] + trainees,
+        schema.SUBJECTS_SHEET: [list(schema.SUBJECTS_COLS)] + subjects,
+        schema.ABSENCES_SHEET: [list(schema.ABSENCES_COLS)] + absences,
+        schema.NOTIF_LOG_SHEET: [list(schema.NOTIF_LOG_COLS)],
+    }
+
+
+def sized(schema, n_absences: int, branches=BRANCHES, absences_per_trainee: float = 12.0, seed: int = 1) -> dict:
+    """dataset فيه تقريبًا n_absences غياب (المتكوّنين يكبرو مع الحجم كيف مدرسة حقيقية)."""
+    per_branch = max(1, round(n_absences / absences_per_trainee / len(branches)))
+    return generate(schema, branches, trainees_per_branch=per_branch, subjects_per_branch=12,
+                    absences_per_trainee=absences_per_trainee, seed=seed)
+
+
+def seed_spreadsheet(sh, data: dict):
+    for title, rows in data.items():
+        sh.add_sheet(title, rows)
+    return sh
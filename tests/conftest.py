@@ -0,0 +1,37 @@
+# fixtures مشتركة: fake Sheets backend (benchmarks/fake_gspread) + dataset اصطناعي (benchmarks/synthetic).
+#
+#     python -m pytest -q tests
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+from fake_gspread import FakeClient, FakeSpreadsheet  # noqa: E402
+from synthetic import seed_spreadsheet, sized  # noqa: E402
+
+from attendancehub import gsheets, runtime, schema  # noqa: E402
+
+
+@pytest.fixture
+def sh():
+    """شيت fake فيه ~600 غياب (فرعين)، مربوط بالـ core؛ الـ stores الكل من الصفر."""
+    runtime.reset_stores()
+    gsheets.SHEETS_QUOTA_PER_MIN = 10 ** 9
+    sh = seed_spreadsheet(FakeSpreadsheet(), sized(schema, 600, seed=3))
+    gsheets.connect(FakeClient(sh), sh.id)
+    return sh
+
+
+def sheet_ids(sh, title: str) -> list[str]:
+    return [r[0] for r in sh.wss[title].rows[1:] if r and r[0]]
+
+
+def absence(i: int, trainee_id: str, subject_id: str, hours: str = "2", justifie: str = "Non") -> dict:
+    return {
+        "id": f"new{i}", "trainee_id": trainee_id, "subject_id": subject_id, "date": "2025-11-03",
+        "heures_absence": hours, "justifie": justifie, "commentaire": "",
+    }
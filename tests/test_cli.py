@@ -0,0 +1,91 @@
+# CLI: parsing متاع الـ args + report كامل على الـ fake backend (CSV / JSON، سجل الإشعارات، --no-log / --resend).
+
+import json
+
+import pandas as pd
+import pytest
+from conftest import sheet_ids
+from fake_gspread import FakeClient
+
+from attendancehub import cli, gsheets, reports, schema
+
+LOG = schema.NOTIF_LOG_SHEET
+
+
+@pytest.fixture
+def run(sh, tmp_path, monkeypatch):
+    creds = tmp_path / "sa.json"
+    creds.write_text("{}")
+    monkeypatch.setattr(cli, "authorize_service_account", lambda path: FakeClient(sh))
+
+    def run(*argv):
+        return cli.main(["report", "--credentials", str(creds), "--sheet-id", sh.id, *argv])
+
+    return run
+
+
+def test_branches_aliases():
+    assert cli._branches(None) == list(schema.BRANCHES)
+    assert cli._branches(["bz", "Bizerte", "MB"]) == ["Bizerte", "Menzel Bourguiba"]
+    with pytest.raises(SystemExit, match="فرع غير معروف"):
+        cli._branches(["Tunis"])
+
+
+def test_missing_sheet_id_and_credentials(tmp_path, monkeypatch):
+    monkeypatch.delenv("ATTENDANCEHUB_SHEET_ID", raising=False)
+    with pytest.raises(SystemExit, match="SPREADSHEET_ID"):
+        cli.main(["report", "--sheet-id", ""])
+    with pytest.raises(SystemExit, match="service account"):
+        cli.main(["report", "--sheet-id", "x", "--credentials", str(tmp_path / "none.json")])
+
+
+def test_parser_args():
+    args = cli.build_parser().parse_args(
+        ["report", "--branch", "BZ", "--period", "custom", "--from", "2025-11-01", "--to", "2025-11-30", "--kind", "period"]
+    )
+    assert (args.date_from.isoformat(), args.date_to.isoformat()) == ("2025-11-01", "2025-11-30")
+    assert args.target == "parent" and args.out == "links.csv" and not args.no_log and not args.resend
+    with pytest.raises(SystemExit):
+        cli.build_parser().parse_args(["report", "--date", "01/11/2025"])
+
+
+def test_report_csv_logs_once(sh, run, tmp_path):
+    out = tmp_path / "exceed.csv"
+    n_log = len(sheet_ids(sh, LOG))
+    assert run("--branch", "BZ", "--kind", "exceed", "--target", "trainee", "--out", str(out)) == 0
+
+    df = pd.read_csv(out, encoding="utf-8-sig", dtype=str)
+    assert list(df.columns) == reports.REPORT_COLS
+    assert len(df) > 0 and set(df["kind"]) == {"exceed_10pct"} and set(df["branche"]) == {"Bizerte"}
+    assert df["link"].str.startswith("https://wa.me/").all()
+    assert len(sheet_ids(sh, LOG)) == n_log + len(df)
+
+    # مرة ثانية: اللي تبعثلهم ما يرجعوش
+    assert run("--branch", "BZ", "--kind", "exceed", "--target", "trainee", "--out", str(out)) == 0
+    assert pd.read_csv(out, encoding="utf-8-sig").empty
+    # --resend: يرجعو بـ already_sent وما يتسجّلوش مرة أخرى
+    assert run("--branch", "BZ", "--kind", "exceed", "--target", "trainee", "--out", str(out), "--resend") == 0
+    again = pd.read_csv(out, encoding="utf-8-sig", dtype=str)
+    assert len(again) == len(df) and (again["already_sent"] == "True").all()
+    assert len(sheet_ids(sh, LOG)) == n_log + len(df)
+
+
+def test_report_json_no_log(sh, run, tmp_path):
+    out = tmp_path / "period.json"
+    n_log = len(sheet_ids(sh, LOG))
+    assert run("--kind", "period", "--period", "custom", "--from", "2025-09-01", "--to", "2026-06-30",
+               "--out", str(out), "--no-log") == 0
+
+    recs = json.loads(out.read_text(encoding="utf-8"))
+    assert recs and {r["kind"] for r in recs} == {"period"}
+    assert {r["branche"] for r in recs} == set(schema.BRANCHES)
+    assert {(r["period_from"], r["period_to"]) for r in recs} == {("2025-09-01", "2026-06-30")}
+    assert len(sheet_ids(sh, LOG)) == n_log
+
+
+def test_report_sheets_unavailable(sh, run, tmp_path, monkeypatch):
+    def down(*_):
+        raise gsheets.SheetsUnavailable("down")
+
+    monkeypatch.setattr(cli, "prefetch_sheets", down)
+    assert run("--out", str(tmp_path / "x.csv")) == 1
@@ -0,0 +1,173 @@
+# جدول 10٪ (aggregate الساعات غير المبرّرة): الـ delta متاع كتابات التطبيق = rebuild كامل،
+# تعديلات يدوية في الشيت تبان بعد أي full refetch، والـ locks متاع الشيت والجدول ما يتركّبوش.
+
+import threading
+import time
+
+import pytest
+from conftest import absence, sheet_ids
+
+from attendancehub import analytics, schema, storage
+
+ABS, ABS_COLS = schema.ABSENCES_SHEET, schema.ABSENCES_COLS
+
+
+def _assert_matches_rebuild():
+    agg = analytics._exceed_store()
+    full = {}
+    analytics._exceed_rebuild(full, storage.load_absences())
+    assert agg["counts"] == full["counts"]
+    assert agg["hours"].keys() == full["hours"].keys()
+    for k, h in full["hours"].items():
+        assert agg["hours"][k] == pytest.approx(h, abs=1e-9)
+
+
+def _count_rebuilds(monkeypatch) -> list:
+    rebuilds = []
+    real_rebuild = analytics._exceed_rebuild
+    monkeypatch.setattr(analytics, "_exceed_rebuild", lambda agg, df: (rebuilds.append(1), real_rebuild(agg, df)))
+    return rebuilds
+
+
+def test_incremental_exceed_matches_rebuild(sh, monkeypatch):
+    assert analytics._exceed_sync() is not None
+    rebuilds = _count_rebuilds(monkeypatch)
+
+    df = storage.load_absences()
+    tid, sid = str(df["trainee_id"].iloc[0]), str(df["subject_id"].iloc[0])
+    ids = sheet_ids(sh, ABS)
+
+    storage.append_records(ABS, ABS_COLS, [absence(i, tid, sid, hours=h) for i, h in enumerate(["1.1", "2,5", "0.3"])])
+    storage.delete_records_by_ids(ABS, ABS_COLS, [ids[7], "new0"])
+    assert analytics._exceed_sync() is not None
+
+    assert rebuilds == []  # append / delete بالـ write-through: كل شي بالـ delta
+    _assert_matches_rebuild()
+
+
+def test_updates_then_refetch_match_rebuild(sh):
+    assert analytics._exceed_sync() is not None
+    ids = sheet_ids(sh, ABS)
+    storage.update_records_fields_by_id(ABS, ABS_COLS, {
+        ids[3]: {"heures_absence": "1.7"},
+        ids[4]: {"justifie": "Oui"},
+    })
+    assert analytics._exceed_sync() is not None
+    _assert_matches_rebuild()
+
+
+def _unjustified_row(sh) -> list:
+    return next(r for r in sh.wss[ABS].rows[1:] if r[ABS_COLS.index("justifie")] == "Non")
+
+
+def test_manual_edit_is_picked_up_after_app_update(sh):
+    assert analytics._exceed_sync() is not None
+    row = _unjustified_row(sh)
+    row[ABS_COLS.index("justifie")] = "Oui"  # تعديل يدوي في الشيت
+
+    other = next(i for i in sheet_ids(sh, ABS) if i != row[0])
+    storage.update_record_fields_by_id(ABS, ABS_COLS, other, {"commentaire": "x"})  # كتابة ما عندهاش علاقة
+    assert analytics._exceed_sync() is not None
+
+    assert analytics._exceed_store()["by_abs"][row[0]][3] is True
+    _assert_matches_rebuild()
+
+
+def test_full_refetch_rebuilds(sh, monkeypatch):
+    assert analytics._exceed_sync() is not None
+    rows = sh.wss[ABS].rows
+    row = _unjustified_row(sh)
+    row[ABS_COLS.index("heures_absence")] = "9"  # تعديل يدوي فوق آخر سطر (الـ incremental ما يشوفوش)
+
+    storage.append_records(ABS, ABS_COLS, [absence(0, row[1], row[2])])  # write-through: stamp يمشي مع الـ snapshot
+    assert analytics._exceed_sync() is not None
+    _assert_matches_rebuild()
+
+    later = time.time() + storage.FULL_RESYNC_SEC + 1
+    monkeypatch.setattr(storage, "_now_ts", lambda: later)
+    assert analytics._exceed_sync() is not None
+    assert analytics._exceed_store()["by_abs"][row[0]][2] == 9.0
+    _assert_matches_rebuild()
+    assert len(storage.load_absences()) == len(rows) - 1
+
+
+class _TrackedLock:
+    """RLock يسجّل كان thread شدّ lock آخر وهو شادّ هذا."""
+
+    held = threading.local()
+
+    def __init__(self, name: str, nested: list):
+        self.name, self.nested, self.lock = name, nested, threading.RLock()
+
+    def __enter__(self):
+        names = self.held.__dict__.setdefault("names", [])
+        outer = [n for n in names if n != self.name]
+        if outer:
+            self.nested.append((tuple(outer), self.name))
+        self.lock.acquire()
+        names.append(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.held.names.pop()
+        self.lock.release()
+
+
+def test_sheet_and_aggregate_locks_never_nest(sh):
+    nested = []
+    storage._sheet_cache_store()["lock"] = _TrackedLock("sheets", nested)
+    analytics._exceed_store()["lock"] = _TrackedLock("exceed", nested)
+    analytics._notified_store()["lock"] = _TrackedLock("notified", nested)
+
+    assert analytics._exceed_sync() is not None
+    analytics.notified_index()
+    df = storage.load_absences()
+    tid, sid = str(df["trainee_id"].iloc[0]), str(df["subject_id"].iloc[0])
+    storage.append_records(ABS, ABS_COLS, [absence(0, tid, sid)])
+    storage.delete_records_by_ids(ABS, ABS_COLS, ["new0"])
+    storage.update_record_fields_by_id(ABS, ABS_COLS, sheet_ids(sh, ABS)[0], {"justifie": "Oui"})
+    storage.append_notification_logs([])
+
+    # incremental fetch (أسطر جديدة من برّا) -> _exceed_absences_fetched
+    assert analytics._exceed_sync() is not None
+    sh.wss[ABS].rows.append(["ext1", tid, sid, "2025-12-01", "2", "Non", ""])
+    store = storage._sheet_cache_store()
+    store["frames"][ABS]["at"] -= storage.DATA_TTL_SEC + 1
+    assert analytics._exceed_sync() is not None
+    assert "ext1" in analytics._exceed_store()["by_abs"]
+
+    assert nested == []
+    _assert_matches_rebuild()
+
+
+def test_concurrent_writes_and_syncs_finish(sh):
+    df = storage.load_absences()
+    tid, sid = str(df["trainee_id"].iloc[0]), str(df["subject_id"].iloc[0])
+    assert analytics._exceed_sync() is not None
+    errors = []
+
+    def writer():
+        try:
+            for i in range(30):
+                storage.append_records(ABS, ABS_COLS, [absence(i, tid, sid)])
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    def reader():
+        try:
+            for i in range(30):
+                sh.wss[ABS].rows.append([f"ext{i}", tid, sid, "2025-12-01", "1", "Non", ""])
+                frame = storage._sheet_cache_store()["frames"].get(ABS)
+                if frame is not None:
+                    frame["at"] -= storage.DATA_TTL_SEC + 1  # الـ load الجاي = incremental fetch
+                analytics._exceed_sync()
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=f, daemon=True) for f in (writer, reader)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert not any(t.is_alive() for t in threads)
+    assert errors == []
@@ -0,0 +1,74 @@
+# typed_frame: الساعات float64 (القيمة المكتوبة ترجع كيف هي)، نفس الـ dtypes للشيت الفارغ،
+# وحدّ 10٪ بالضبط يعطي سطر الإقصاء.
+
+from datetime import date
+
+from conftest import absence, sheet_ids
+from synthetic import BRANCHES
+
+from attendancehub import analytics, schema, storage
+
+ABS, ABS_COLS = schema.ABSENCES_SHEET, schema.ABSENCES_COLS
+TR, TR_COLS = schema.TRAINEES_SHEET, schema.TRAINEES_COLS
+
+
+def test_update_then_read(sh):
+    abs_id = sheet_ids(sh, ABS)[5]
+    storage.update_record_fields_by_id(ABS, ABS_COLS, abs_id, {"heures_absence": "1.1", "justifie": "Oui"})
+
+    row = next(r for r in sh.wss[ABS].rows if r[0] == abs_id)
+    assert row[ABS_COLS.index("heures_absence")] == "1.1"
+
+    df = storage.load_absences()
+    rec = df[df["id"] == abs_id].iloc[0]
+    # فورم التعديل يكتب str(float(...)): float32 كان يرجّع "1.100000023841858"
+    assert str(float(rec["heures_absence"])) == "1.1"
+    assert bool(rec["justifie"]) is True
+
+    tr_id = sheet_ids(sh, TR)[0]
+    storage.update_record_fields_by_id(TR, TR_COLS, tr_id, {"nom": "RENAMED"})
+    df_tr = storage.load_trainees()
+    assert df_tr.loc[df_tr["id"] == tr_id, "nom"].tolist() == ["RENAMED"]
+
+
+def test_loaded_and_empty_frames_share_dtypes(sh):
+    sh.add_sheet("Empty", [ABS_COLS])
+    loaded = storage._load_sheet(ABS, ABS_COLS).dtypes
+    empty = storage._load_sheet("Empty", ABS_COLS).dtypes
+    assert {c: str(t) for c, t in loaded.items()} == {c: str(t) for c, t in empty.items()}
+
+
+def test_exact_10pct_is_elimination(sh):
+    # 1.5 ساعة غير مبرّرة من 15 = 10٪ بالضبط -> سطر الإقصاء (مش "مزال 0.00")
+    branch = BRANCHES[0]
+    df_tr = storage.load_trainees()
+    tr = df_tr[df_tr["branche"] == branch].iloc[0]
+    sub_id = "s_exact"
+    storage.append_records(schema.SUBJECTS_SHEET, schema.SUBJECTS_COLS, [{
+        "id": sub_id, "nom_matiere": "Exact", "branche": branch, "specialites": tr["specialite"], "heures_totales": "15",
+    }])
+    storage.append_records(ABS, ABS_COLS, [
+        {**absence(i, tr["id"], sub_id, hours="0.5"), "id": f"ex{i}"} for i in range(3)
+    ])
+
+    df_sub, df_abs = storage.load_subjects(), analytics.enriched_absences(branch)
+    d = date(2025, 11, 3)
+    msg, _ = analytics.build_whatsapp_message_for_trainee(tr, df_abs, df_sub, branch, d, d, "P")
+    assert "- Exact (تجاوز بـ 0.00 ساعة)" in msg
+    assert "Exact: مزال" not in msg
+    batch = analytics.build_whatsapp_messages_for_trainees(df_tr[df_tr["id"] == tr["id"]], df_abs, df_sub, branch, d, d, "P")
+    assert batch[tr["id"]][0] == msg
+
+
+def test_only_oui_is_justified(sh):
+    # نفس النسخة القديمة: justifie == "Oui" برك؛ "1" / "oui" / "true" تقعد غير مبرّرة (تتحسب في 10٪)
+    ids = sheet_ids(sh, ABS)[:6]
+    values = ["Oui", " Oui ", "oui", "1", "true", "Non"]
+    storage.update_records_fields_by_id(ABS, ABS_COLS, {i: {"justifie": v} for i, v in zip(ids, values)})
+
+    df = storage.load_absences().set_index("id")
+    assert [bool(df.loc[i, "justifie"]) for i in ids] == [True, True, False, False, False, False]
+
+    analytics._exceed_sync()
+    by_abs = analytics._exceed_store()["by_abs"]
+    assert [by_abs[i][3] for i in ids] == [True, True, False, False, False, False]
@@ -0,0 +1,133 @@
+# import الغيابات: تحقّق vectorized + تقرير الأسطر المرفوضة، chunks، الساعات بلا تدوير،
+# ووقفة في الوسط ترجّع التقرير وقدّاش تسجّل.
+
+import io
+
+import pytest
+from synthetic import BRANCHES
+
+from attendancehub import importer, schema, storage
+
+ABS = schema.ABSENCES_SHEET
+BRANCH = BRANCHES[0]
+HEADER = "trainee_id,subject_id,date,heures_absence,justifie,commentaire\n"
+
+
+def _csv(lines: list[str]) -> io.BytesIO:
+    f = io.BytesIO((HEADER + "\n".join(lines) + "\n").encode("utf-8"))
+    f.name = "absences.csv"
+    return f
+
+
+def _run(f, chunk_rows: int = importer.IMPORT_CHUNK_ROWS) -> dict:
+    return importer.import_absences(importer.read_import_chunks(f, chunk_rows), BRANCH)
+
+
+def _existing(branch_prefix: str = "t0_") -> list:
+    row = next(r for r in storage.load_absences().itertuples() if str(r.trainee_id).startswith(branch_prefix))
+    return [str(row.trainee_id), str(row.subject_id), row.date.strftime("%Y-%m-%d")]
+
+
+def test_validation_and_rejection_report(sh):
+    tid, sid, day = _existing()
+    lines = [
+        "t0_0,s0_0,2026-01-05,2,Oui,ok",            # 2  مقبول
+        "t0_1,s0_1,05/01/2026,\"1,5\",Non,",         # 3  مقبول (تاريخ بصيغة أخرى، فاصلة عشرية)
+        "nobody,s0_0,2026-01-05,2,,",                # 4
+        "t1_0,s0_0,2026-01-05,2,,",                  # 5  متكوّن من الفرع الآخر
+        "t0_0,s1_0,2026-01-05,2,,",                  # 6  مادة من الفرع الآخر
+        "t0_0,s0_0,not-a-date,2,,",                  # 7
+        "t0_0,s0_0,2026-01-06,0,,",                  # 8
+        "t0_0,s0_0,2026-01-06,abc,,",                # 9
+        "t0_0,s0_0,2026-01-05,3,,",                  # 10 مكرّر في الملف (نفس السطر 2)
+        f"{tid},{sid},{day},1,,",                    # 11 موجود في الشيت
+    ]
+    n_before = len(storage.load_absences())
+    res = _run(_csv(lines))
+
+    assert (res["read"], res["imported"], res["error"], res["not_written"]) == (10, 2, None, 0)
+    rej = res["rejected"].set_index("ligne")["raison"].to_dict()
+    assert rej == {
+        4: "trainee_id غير موجود",
+        5: "المتكوّن من فرع آخر",
+        6: "المادة من فرع آخر",
+        7: "تاريخ غير صالح",
+        8: "الساعات لازم رقم أكبر من 0",
+        9: "الساعات لازم رقم أكبر من 0",
+        10: "مكرّر في الملف",
+        11: "موجود من قبل",
+    }
+
+    df = storage.load_absences()
+    assert len(df) == n_before + 2
+    new = df.iloc[-2:]
+    assert new["trainee_id"].astype(str).tolist() == ["t0_0", "t0_1"]
+    assert new["justifie"].tolist() == [True, False]
+    assert new["heures_absence"].tolist() == [2.0, 1.5]
+
+
+def test_duplicates_across_chunks_are_rejected(sh):
+    lines = [f"t0_{i},s0_0,2026-01-0{1 + i % 5},1,," for i in range(6)] + ["t0_0,s0_0,2026-01-01,1,,"]
+    res = _run(_csv(lines), chunk_rows=3)
+    assert res["imported"] == 6
+    assert res["rejected"][["ligne", "raison"]].values.tolist() == [[8, "موجود من قبل"]]
+
+
+def test_hours_keep_precision(sh):
+    res = _run(_csv(["t0_0,s0_0,2026-01-05,1.23456789,,", "t0_0,s0_0,2026-01-06,12345.678,,"]))
+    assert res["imported"] == 2
+    written = [r[schema.ABSENCES_COLS.index("heures_absence")] for r in sh.wss[ABS].rows[-2:]]
+    assert written == ["1.23456789", "12345.678"]
+
+
+def test_missing_columns_is_reported(sh):
+    f = io.BytesIO(b"trainee_id,date\nt0_0,2026-01-05\n")
+    f.name = "bad.csv"
+    res = _run(f)
+    assert res["imported"] == 0
+    assert "subject_id" in res["error"] and "heures_absence" in res["error"]
+
+
+def test_failure_midway_returns_partial_report(sh, monkeypatch):
+    monkeypatch.setattr(importer, "IMPORT_APPEND_BATCH", 2)
+    calls = []
+    real_append = importer.append_records
+
+    def flaky(sheet_name, cols, recs):
+        calls.append(len(recs))
+        if len(calls) == 2:
+            raise RuntimeError("quota")
+        return real_append(sheet_name, cols, recs)
+
+    monkeypatch.setattr(importer, "append_records", flaky)
+    n_before = len(sh.wss[ABS].rows)
+    lines = [f"t0_0,s0_0,2026-02-0{d},1,," for d in range(1, 6)] + ["nobody,s0_0,2026-02-01,1,,"]
+    res = _run(_csv(lines))
+
+    assert res["error"] == "quota"
+    assert res["imported"] == 2 and len(sh.wss[ABS].rows) == n_before + 2
+    assert res["not_written"] == 3
+    assert res["rejected"]["ligne"].tolist() == [7]
+
+    # إعادة نفس الملف: اللي تسجّل يترفض، الباقي يتكتب
+    monkeypatch.setattr(importer, "append_records", real_append)
+    res2 = _run(_csv(lines))
+    assert res2["error"] is None and res2["imported"] == 3
+    assert sorted(res2["rejected"]["ligne"].tolist()) == [2, 3, 7]
+
+
+def test_excel_import(sh):
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(HEADER.strip().split(","))
+    ws.append(["t0_0", "s0_0", "2026-03-02", 1.5, "Oui", None])
+    ws.append(["t0_0", "s0_0", "bad", 1, None, None])
+    f = io.BytesIO()
+    wb.save(f)
+    f.seek(0)
+    f.name = "absences.xlsx"
+
+    res = _run(f)
+    assert (res["read"], res["imported"]) == (2, 1)
+    assert res["rejected"][["ligne", "raison"]].values.tolist() == [[3, "تاريخ غير صالح"]]
@@ -0,0 +1,26 @@
+# build_whatsapp_messages_for_trainees (batch) = build_whatsapp_message_for_trainee لكل متكوّن، حرف بحرف.
+
+from datetime import date
+
+import pytest
+from synthetic import BRANCHES
+
+from attendancehub import analytics, storage
+
+
+@pytest.mark.parametrize("branch", BRANCHES)
+@pytest.mark.parametrize("d_from,d_to", [
+    (date(2025, 9, 1), date(2026, 6, 30)),   # السنة الكل
+    (date(2025, 11, 1), date(2025, 11, 30)),  # شهر
+    (date(2025, 8, 1), date(2025, 8, 31)),    # فترة بلا غيابات
+])
+def test_batch_messages_match_single(sh, branch, d_from, d_to):
+    df_tr = storage.load_trainees()
+    df_tr = df_tr[df_tr["branche"] == branch]
+    df_sub = storage.load_subjects()
+    df_abs = analytics.enriched_absences(branch)
+
+    batch = analytics.build_whatsapp_messages_for_trainees(df_tr, df_abs, df_sub, branch, d_from, d_to, "P")
+    assert set(batch) == set(df_tr["id"])
+    for _, tr in df_tr.iterrows():
+        assert batch[tr["id"]] == analytics.build_whatsapp_message_for_trainee(tr, df_abs, df_sub, branch, d_from, d_to, "P")
@@ -0,0 +1,100 @@
+# local SQLite mirror: sync (pull) ثم read، fallback كان Google Sheets طايح، outbox للـ appends،
+# وجدول ما تعمللوش sync عمرو ما يتخدمش كبيانات.
+
+import gspread.exceptions as gse
+import pytest
+from conftest import absence
+from fake_gspread import FakeResponse
+
+from attendancehub import gsheets, mirror, runtime, schema, storage
+
+ABS, ABS_COLS = schema.ABSENCES_SHEET, schema.ABSENCES_COLS
+
+
+@pytest.fixture
+def local_db(sh, tmp_path, monkeypatch):
+    monkeypatch.setenv("ATTENDANCEHUB_LOCAL_DB", str(tmp_path / "mirror.db"))
+    monkeypatch.setattr(mirror, "_mirror_sync_loop", lambda m: None)  # الـ sync يدوي في الـ tests
+    m = mirror._local_mirror()
+    yield m
+    m["conn"].close()
+
+
+def _sheets_down(monkeypatch):
+    def down(*args, **kwargs):
+        raise gse.APIError(FakeResponse(503, message="backend down", status="UNAVAILABLE"))
+    monkeypatch.setattr(storage, "_load_sheet_shared", down)
+
+
+def test_disabled_without_path(sh, monkeypatch):
+    monkeypatch.delenv("ATTENDANCEHUB_LOCAL_DB", raising=False)
+    runtime.SETTINGS.pop("LOCAL_DB_PATH", None)
+    assert mirror._local_mirror() is None
+    assert mirror.mirror_read(ABS) is None
+    assert mirror.mirror_enqueue_appends(ABS, [["x"] * len(ABS_COLS)]) is False
+
+
+def test_sync_then_read(local_db):
+    mirror.mirror_sync_once(local_db)
+    for sheet_name, cols in mirror.MIRROR_SHEETS.items():
+        df_sheet = storage._load_sheet(sheet_name, cols)
+        df_local = mirror.mirror_read(sheet_name)
+        assert df_local["id"].tolist() == df_sheet["id"].tolist()
+        assert {c: str(t) for c, t in df_local.dtypes.items()} == {c: str(t) for c, t in df_sheet.dtypes.items()}
+
+    df = mirror.mirror_read(ABS)
+    ref = storage.load_absences()
+    assert df["heures_absence"].sum() == pytest.approx(ref["heures_absence"].sum())
+    assert df["justifie"].sum() == ref["justifie"].sum()
+    assert (df["date"] == ref["date"]).all()
+
+
+def test_sync_pulls_remote_changes(local_db, sh):
+    mirror.mirror_sync_once(local_db)
+    sh.wss[ABS].rows.append(["ext1", "t0_0", "s0_0", "2025-12-01", "2", "Non", ""])
+    storage.invalidate_sheet(ABS)  # snapshot جديد (كيف بعد الـ TTL)
+    mirror.mirror_sync_once(local_db)
+    assert "ext1" in mirror.mirror_read(ABS)["id"].tolist()
+
+
+def test_fallback_read_when_sheets_down(local_db, monkeypatch):
+    mirror.mirror_sync_once(local_db)
+    n = len(storage.load_absences())
+
+    warnings = []
+    monkeypatch.setitem(runtime.UI_HOOKS, "warning", warnings.append)
+    _sheets_down(monkeypatch)
+    df = storage.load_absences()
+    assert len(df) == n
+    assert len(warnings) == 1
+
+
+def test_never_synced_mirror_is_not_served(local_db, monkeypatch):
+    assert mirror.mirror_read(ABS) is None
+
+    errors, warnings = [], []
+    monkeypatch.setitem(runtime.UI_HOOKS, "error", errors.append)
+    monkeypatch.setitem(runtime.UI_HOOKS, "warning", warnings.append)
+    _sheets_down(monkeypatch)
+    df = storage.load_absences()
+    assert df.empty
+    assert warnings == [] and len(errors) == 1  # خطأ الـ API يبان، موش "البيانات من النسخة المحلية"
+
+
+def test_outbox_appends_when_sheets_down(local_db, sh, monkeypatch):
+    mirror.mirror_sync_once(local_db)
+    n_sheet = len(sh.wss[ABS].rows)
+
+    def quota(*args, **kwargs):
+        raise gsheets.SheetsUnavailable("breaker open")
+    real_append = storage.safe_append_rows
+    monkeypatch.setattr(storage, "safe_append_rows", quota)
+    storage.append_records(ABS, ABS_COLS, [absence(0, "t0_0", "s0_0")])
+    assert len(sh.wss[ABS].rows) == n_sheet
+    assert "new0" in mirror.mirror_read(ABS)["id"].tolist()
+
+    monkeypatch.setattr(storage, "safe_append_rows", real_append)
+    assert mirror.mirror_push_outbox() == 1
+    assert sh.wss[ABS].rows[-1][0] == "new0"
+    assert "new0" in storage.load_absences()["id"].tolist()
+    assert mirror.mirror_push_outbox() == 0
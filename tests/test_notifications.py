@@ -0,0 +1,73 @@
+# de-dup متاع الإشعارات: 10٪ مرّة لكل (متكوّن، target، فرع) مهما تبدّل النهار؛ إعلام المدة بالفترة.
+
+from datetime import date
+
+import pytest
+from fake_gspread import FakeClient
+from synthetic import BRANCHES
+
+from attendancehub import analytics, gsheets, reports, runtime, storage
+
+BRANCH = BRANCHES[0]
+
+
+@pytest.fixture
+def today(monkeypatch):
+    day = [date(2025, 11, 10)]
+
+    class FakeDate(date):
+        @classmethod
+        def today(cls):
+            return day[0]
+
+    monkeypatch.setattr(reports, "date", FakeDate)
+    return day
+
+
+def _send(rows):
+    storage.append_notification_logs(reports.log_recs(rows))
+
+
+def test_exceed_not_resent_next_day(sh, today):
+    rows = reports.branch_report(BRANCH, "Trainee", kinds=("exceed_10pct",))
+    assert rows and not any(r["already_sent"] for r in rows)
+    _send(rows)
+
+    today[0] = date(2025, 11, 11)
+    assert reports.branch_report(BRANCH, "Trainee", kinds=("exceed_10pct",)) == []
+    again = reports.branch_report(BRANCH, "Trainee", kinds=("exceed_10pct",), skip_sent=False)
+    assert {r["trainee_id"] for r in again} == {r["trainee_id"] for r in rows}
+    assert all(r["already_sent"] for r in again) and reports.log_recs(again) == []
+
+    # الولي إشعار آخر
+    assert len(reports.branch_report(BRANCH, "Parent", kinds=("exceed_10pct",))) > 0
+
+
+def test_exceed_sent_in_previous_process(sh, today):
+    rows = reports.branch_report(BRANCH, "Trainee", kinds=("exceed_10pct",))
+    _send(rows)
+
+    runtime.reset_stores()  # process جديد: الـ index يتبنى من الشيت
+    gsheets.connect(FakeClient(sh), sh.id)
+    today[0] = date(2025, 12, 1)
+    assert reports.branch_report(BRANCH, "Trainee", kinds=("exceed_10pct",)) == []
+
+
+def test_period_notifications_keyed_on_period(sh):
+    week = reports.period_range("custom", d_from=date(2025, 9, 1), d_to=date(2026, 6, 30))
+    rows = reports.branch_report(BRANCH, "Trainee", kinds=("period",), period=week)
+    assert rows
+    _send(rows)
+    assert reports.branch_report(BRANCH, "Trainee", kinds=("period",), period=week) == []
+
+    other = reports.period_range("custom", d_from=date(2025, 9, 1), d_to=date(2026, 6, 29))
+    assert len(reports.branch_report(BRANCH, "Trainee", kinds=("period",), period=other)) > 0
+
+
+def test_notification_key_kinds():
+    k1 = analytics.notification_key("t0_1", "Trainee", BRANCH, date(2025, 1, 1), date(2025, 1, 1), "تجاوز 10٪ (مجمّع) + تدارك جويلية")
+    k2 = analytics.notification_key("t0_1", "Trainee", BRANCH, "2025-03-04", "2025-03-04", "تجاوز 10٪ (مجمّع) + تدارك جوان")
+    assert k1 == k2 == ("exceed_10pct", "t0_1", "Trainee", BRANCH)
+    assert analytics.notification_key("t0_1", "Trainee", BRANCH, date(2025, 1, 1), date(2025, 1, 7), "x") == (
+        "period", "t0_1", "Trainee", "2025-01-01", "2025-01-07", "x"
+    )
@@ -0,0 +1,102 @@
+# _api_call: Retry-After، أخطاء ما تتعاودش، والـ circuit breaker (open -> cooldown -> half-open).
+
+import gspread.exceptions as gse
+import pytest
+from fake_gspread import FakeResponse
+
+from attendancehub import gsheets, runtime
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """وقت fake: time.sleep يقدّم الساعة بلا ما يستنى، ونسجّلو كل sleep."""
+    runtime.reset_stores()
+    monkeypatch.setattr(gsheets, "SHEETS_QUOTA_PER_MIN", 10 ** 9)
+    now, sleeps = [1000.0], []
+
+    def sleep(sec):
+        sleeps.append(sec)
+        now[0] += sec
+
+    monkeypatch.setattr(gsheets.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(gsheets.time, "sleep", sleep)
+    return now, sleeps
+
+
+def _flaky(*errors, result="ok"):
+    """call يرمي الأخطاء بالترتيب وبعدها يرجّع result؛ calls[0] = عدد المرات."""
+    calls = [0]
+
+    def call():
+        calls[0] += 1
+        if calls[0] <= len(errors):
+            raise errors[calls[0] - 1]
+        return result
+
+    return call, calls
+
+
+def _api_error(status, retry_after=None):
+    return gse.APIError(FakeResponse(status, retry_after))
+
+
+def test_retry_after_is_honoured(clock):
+    _, sleeps = clock
+    call, calls = _flaky(_api_error(429, retry_after=7), _api_error(429, retry_after=3))
+    assert gsheets._api_call("op", call) == "ok"
+    assert calls[0] == 3
+    assert sleeps[0] >= 7 and sleeps[1] >= 3
+    s = gsheets.api_stats()["op"]
+    assert (s["retries"], s["throttled"], s["ok"], s["errors"]) == (2, 2, 1, 0)
+
+
+def test_backoff_without_retry_after_is_capped(clock):
+    _, sleeps = clock
+    call, _ = _flaky(_api_error(503), ConnectionError("reset"))
+    assert gsheets._api_call("op", call) == "ok"
+    assert len(sleeps) == 2
+    assert all(s <= min(gsheets.RETRY_MAX_SEC, gsheets.RETRY_BASE_SEC * 2 ** i) for i, s in enumerate(sleeps))
+
+
+def test_non_transient_error_is_not_retried(clock):
+    _, sleeps = clock
+    call, calls = _flaky(_api_error(400))
+    with pytest.raises(gse.APIError):
+        gsheets._api_call("op", call)
+    assert calls[0] == 1 and sleeps == []
+    assert gsheets._api_guard()["fails"] == 0
+
+
+def test_last_error_raised_after_tries(clock):
+    call, calls = _flaky(*[_api_error(503)] * 3)
+    with pytest.raises(gse.APIError):
+        gsheets._api_call("op", call, tries=3)
+    assert calls[0] == 3 and gsheets.api_stats()["op"]["errors"] == 1
+
+
+def test_breaker_opens_and_recovers_after_cooldown(clock):
+    now, _ = clock
+    n = gsheets.BREAKER_FAIL_THRESHOLD
+    call, calls = _flaky(*[_api_error(503)] * (n + 1))
+
+    with pytest.raises(gse.APIError):
+        gsheets._api_call("op", call, tries=n - 1)
+    with pytest.raises(gsheets.SheetsUnavailable):  # الفشل رقم n يحلّ الـ breaker وسط الـ retries
+        gsheets._api_call("op", call)
+    assert calls[0] == n
+
+    with pytest.raises(gsheets.SheetsUnavailable):  # محلول: حتى طلب ما يخرج
+        gsheets._api_call("op", call)
+    assert calls[0] == n
+
+    # half-open بعد الـ cooldown: فشل واحد يعاود يحلّو
+    now[0] += gsheets.BREAKER_COOLDOWN_SEC + 1
+    with pytest.raises(gsheets.SheetsUnavailable):
+        gsheets._api_call("op", call)
+    assert calls[0] == n + 1
+
+    # نجاح بعد الـ cooldown يسكّرو ويرجّع العدّاد لـ 0
+    now[0] += gsheets.BREAKER_COOLDOWN_SEC + 1
+    assert gsheets._api_call("op", call) == "ok"
+    g = gsheets._api_guard()
+    assert (g["fails"], g["open_until"]) == (0, 0.0)
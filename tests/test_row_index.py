@@ -0,0 +1,52 @@
+# row index (id -> رقم السطر) يقعد يطابق الشيت بعد append / delete بلا ما يتعاود يتقرا.
+
+from conftest import absence, sheet_ids
+from synthetic import BRANCHES
+
+from attendancehub import schema, storage
+
+ABS, ABS_COLS = schema.ABSENCES_SHEET, schema.ABSENCES_COLS
+TR, TR_COLS = schema.TRAINEES_SHEET, schema.TRAINEES_COLS
+
+
+def _assert_index_matches_sheet(sh, title: str, cols: list[str]):
+    ws = sh.wss[title]
+    idx = storage._row_index(ws, cols)
+    expected = {r[0]: row for row, r in enumerate(ws.rows[1:], start=2) if r and r[0]}
+    assert idx["ids"] == expected
+
+
+def test_insert_delete_keeps_row_index(sh):
+    df = storage.load_absences()
+    tid, sid = str(df["trainee_id"].iloc[0]), str(df["subject_id"].iloc[0])
+
+    assert storage.append_records(ABS, ABS_COLS, [absence(i, tid, sid) for i in range(3)]) == 3
+    _assert_index_matches_sheet(sh, ABS, ABS_COLS)
+
+    ids = sheet_ids(sh, ABS)
+    gone = [ids[0], ids[len(ids) // 2], ids[len(ids) // 2 + 1], "new1"]
+    assert storage.delete_records_by_ids(ABS, ABS_COLS, gone) == len(gone)
+    assert not set(gone) & set(sheet_ids(sh, ABS))
+    _assert_index_matches_sheet(sh, ABS, ABS_COLS)
+
+    # الـ snapshot (write-through) = الشيت
+    assert storage.load_absences()["id"].tolist() == sheet_ids(sh, ABS)
+
+
+def test_delete_by_branch_keeps_row_index(sh):
+    n = storage.delete_records_by_branch(TR, TR_COLS, BRANCHES[0])
+    assert n > 0
+    assert set(storage.load_trainees()["branche"]) == {BRANCHES[1]}
+    _assert_index_matches_sheet(sh, TR, TR_COLS)
+
+
+def test_stale_index_is_rebuilt_after_external_insert(sh):
+    storage.load_absences()
+    ws = sh.wss[ABS]
+    ws.rows.insert(1, ["ext0", "t0_0", "s0_0", "2025-10-01", "1", "Non", ""])  # سطر تزاد من برّا (فوق)
+
+    target = sheet_ids(sh, ABS)[10]
+    storage.update_record_fields_by_id(ABS, ABS_COLS, target, {"commentaire": "ok"})
+    row = next(r for r in ws.rows if r and r[0] == target)
+    assert row[ABS_COLS.index("commentaire")] == "ok"
+    _assert_index_matches_sheet(sh, ABS, ABS_COLS)
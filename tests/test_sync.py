@@ -0,0 +1,65 @@
+# incremental sync متاع Absences: أسطر جديدة بـ call خفيفة، وتعديل يدوي يبان في full resync
+# (ما يفوتش DATA_TTL_SEC، كيف قبل).
+
+import time
+
+import pytest
+
+from attendancehub import schema, storage
+
+ABS, ABS_COLS = schema.ABSENCES_SHEET, schema.ABSENCES_COLS
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(storage, "_now_ts", lambda: now[0])
+    return now
+
+
+def test_full_resync_not_longer_than_data_ttl():
+    assert storage.FULL_RESYNC_SEC <= storage.DATA_TTL_SEC
+    assert storage.INCREMENTAL_TTL_SEC < storage.FULL_RESYNC_SEC
+
+
+def test_new_rows_come_incrementally(sh, clock):
+    n = len(storage.load_absences())
+    sh.wss[ABS].rows.append(["ext1", "t0_0", "s0_0", "2025-12-01", "2", "Non", ""])
+
+    clock[0] += storage.INCREMENTAL_TTL_SEC - 1
+    assert len(storage.load_absences()) == n  # مازال في الـ TTL
+
+    clock[0] += 2
+    sh.calls.clear()
+    df = storage.load_absences()
+    assert df["id"].tolist()[-1] == "ext1" and len(df) == n + 1
+    assert sh.calls["get_all_values"] == 0 and sh.calls["values_batch_get"] == 0
+    assert sh.calls["batch_get"] == 1
+
+
+def test_manual_edit_is_visible_after_full_resync(sh, clock):
+    storage.load_absences()
+    row = sh.wss[ABS].rows[5]
+    row[ABS_COLS.index("commentaire")] = "edited by hand"  # فوق الذيل: الـ incremental ما يشوفوش
+
+    clock[0] += storage.INCREMENTAL_TTL_SEC + 1
+    df = storage.load_absences()
+    assert df.loc[df["id"] == row[0], "commentaire"].tolist() == [""]
+
+    clock[0] += storage.FULL_RESYNC_SEC
+    sh.calls.clear()
+    df = storage.load_absences()
+    assert df.loc[df["id"] == row[0], "commentaire"].tolist() == ["edited by hand"]
+    assert sh.calls["get_all_values"] == 1
+
+
+def test_meta_change_forces_full_reload(sh, clock):
+    storage.load_absences()
+    victim = sh.wss[ABS].rows[3][0]
+    del sh.wss[ABS].rows[3]
+    sh.wss[ABS].update_cell(1, len(ABS_COLS) + 1, "changed elsewhere")  # process آخر حذف وبدّل الخلية
+
+    clock[0] += storage.INCREMENTAL_TTL_SEC + 1
+    sh.calls.clear()
+    assert victim not in storage.load_absences()["id"].tolist()
+    assert sh.calls["get_all_values"] == 1
@@ -0,0 +1,61 @@
+# enriched_absences / notifications_with_trainees: نفس نتيجة الـ merge المباشر، memo على الـ snapshots.
+
+from datetime import date
+
+import pandas as pd
+from conftest import absence
+from synthetic import BRANCHES
+
+from attendancehub import analytics, schema, storage
+
+ABS, ABS_COLS = schema.ABSENCES_SHEET, schema.ABSENCES_COLS
+
+
+def _direct_merge(branch: str) -> pd.DataFrame:
+    df_abs, df_tr, df_sub = storage.load_absences(), storage.load_trainees(), storage.load_subjects()
+    df = df_abs.merge(
+        df_tr[["id"] + analytics.ENRICH_TR_COLS].rename(columns={"id": "trainee_id"}), on="trainee_id", how="left"
+    ).merge(
+        df_sub[["id"] + analytics.ENRICH_SUB_COLS].rename(columns={"id": "subject_id"}), on="subject_id", how="left"
+    )
+    return df[df["branche"] == branch]
+
+
+def _rows(df: pd.DataFrame) -> list[tuple]:
+    return sorted(tuple(str(v) for v in r) for r in df.itertuples(index=False))
+
+
+def test_enriched_absences_matches_direct_merge(sh):
+    for branch in BRANCHES:
+        view = analytics.enriched_absences(branch)
+        assert not view.empty
+        assert set(view["branche"].astype(str)) == {branch}
+        assert _rows(view) == _rows(_direct_merge(branch)[view.columns])
+
+
+def test_enriched_view_is_memoized_and_follows_writes(sh):
+    branch = BRANCHES[0]
+    first = analytics._enriched_absences_view()
+    assert analytics._enriched_absences_view() is first  # نفس الـ snapshots -> نفس الـ view
+
+    tr = storage.load_trainees()
+    tr = tr[tr["branche"] == branch].iloc[0]
+    sid = str(storage.load_subjects().query("branche == @branch")["id"].iloc[0])
+    storage.append_records(ABS, ABS_COLS, [absence(0, tr["id"], sid)])
+
+    assert analytics._enriched_absences_view() is not first
+    view = analytics.enriched_absences(branch)
+    assert view.loc[view["id"] == "new0", "nom"].tolist() == [tr["nom"]]
+
+
+def test_notifications_with_trainees(sh):
+    branch = BRANCHES[1]
+    tr = storage.load_trainees()
+    tr = tr[tr["branche"] == branch].iloc[0]
+    storage.append_notification_logs([storage.notification_log_rec(
+        trainee_id=tr["id"], phone="21620000000", target="Parent", branche=branch,
+        period_from=date(2025, 11, 1), period_to=date(2025, 11, 30), period_label="P",
+    )])
+    df = analytics.notifications_with_trainees(branch)
+    assert df[["trainee_id", "nom", "specialite"]].astype(str).values.tolist() == [[tr["id"], tr["nom"], tr["specialite"]]]
+    assert analytics.notifications_with_trainees(BRANCHES[0]).empty
@@ -0,0 +1,43 @@
+# buffered_writes: append_rows واحد لكل شيت عند الخروج، وبلوك طاح ما يكتب حتى شي.
+
+import pytest
+from conftest import absence
+
+from attendancehub import schema, storage
+
+ABS, ABS_COLS = schema.ABSENCES_SHEET, schema.ABSENCES_COLS
+NOTIF, NOTIF_COLS = schema.NOTIF_LOG_SHEET, schema.NOTIF_LOG_COLS
+
+
+def test_buffered_appends_flush_once_per_sheet(sh):
+    storage.load_absences()
+    n_abs, n_notif = len(sh.wss[ABS].rows), len(sh.wss[NOTIF].rows)
+    sh.calls.clear()
+
+    with storage.buffered_writes():
+        for i in range(5):
+            storage.append_record(ABS, ABS_COLS, absence(i, "t0_0", "s0_0"))
+            with storage.buffered_writes():  # nested: البلوك الخارجي يعمل الـ flush
+                storage.append_record(NOTIF, NOTIF_COLS, {"id": f"n{i}", "trainee_id": "t0_0"})
+        assert len(sh.wss[ABS].rows) == n_abs  # مازال ما تبعث شي
+
+    assert sh.calls["append_rows"] == 2
+    assert len(sh.wss[ABS].rows) == n_abs + 5 and len(sh.wss[NOTIF].rows) == n_notif + 5
+    assert storage.load_absences()["id"].tolist()[-5:] == [f"new{i}" for i in range(5)]
+
+
+def test_failed_block_writes_nothing(sh):
+    n_abs = len(sh.wss[ABS].rows)
+    sh.calls.clear()
+
+    with pytest.raises(KeyError, match="boom"):
+        with storage.buffered_writes():
+            storage.append_record(ABS, ABS_COLS, absence(0, "t0_0", "s0_0"))
+            raise KeyError("boom")
+
+    assert sh.calls["append_rows"] == 0
+    assert len(sh.wss[ABS].rows) == n_abs
+
+    # البافر تفرّغ: الكتابة الجاية تمشي عادي
+    storage.append_record(ABS, ABS_COLS, absence(1, "t0_0", "s0_0"))
+    assert [r[0] for r in sh.wss[ABS].rows[n_abs:]] == ["new1"]